@@ -0,0 +1,175 @@
+import time
+import numpy as np
+from engine import BattleshipsGame
+from placement import placements
+from protocol import EV_SHOT, EV_SUNK
+from room import Room
+
+AI_PLAYER = 1
+
+
+def layout_matrix(size, length):
+    """Boolean (placements, cells) matrix: row p covers cell c if ship placement p sits on it"""
+    options = placements(size, length)
+    matrix = np.zeros((len(options), size * size), dtype=bool)
+    for row, option in enumerate(options):
+        step = 1 if option.horizontal else size
+        start = option.y * size + option.x
+        matrix[row, start:start + step * length:step] = True
+    return matrix
+
+
+class HeatmapAI:
+    """Hunt/target opponent that shoots where the most legal ship placements overlap.
+
+    For every ship length it keeps the rows of layout_matrix that are still possible. Misses
+    and cells of sunk ships rule placements out incrementally, and the hunt heatmap is kept
+    up to date by subtracting the column sums of the placements that just died."""
+
+    TARGET_WEIGHT = 1000  # Placements through known hits dwarf everything else
+
+    def __init__(self, size=BattleshipsGame.BOARD_SIZE, ships=BattleshipsGame.SHIPS, seed=None):
+        self.size = size
+        self.lengths = list(ships)
+        self.afloat = list(range(len(self.lengths)))  # Ship ids not sunk yet
+        self.rng = np.random.default_rng(seed)
+        self.layouts = {}
+        self.alive = {}
+        for length in set(self.lengths):
+            self.layouts[length] = layout_matrix(size, length)
+            self.alive[length] = np.ones(len(self.layouts[length]), dtype=bool)
+        self.shot = np.zeros(size * size, dtype=bool)
+        self.open_hits = np.zeros(size * size, dtype=bool)  # Hits not yet explained by a sunk ship
+        self.hunt_heat = np.zeros(size * size, dtype=np.int64)
+        for ship_id in self.afloat:
+            self.hunt_heat += self.layouts[self.lengths[ship_id]].sum(axis=0)
+        self.last_think = 0.0  # Seconds the last choose_shot took
+
+    def afloat_count(self, length):
+        return sum(1 for ship_id in self.afloat if self.lengths[ship_id] == length)
+
+    def block(self, cells):
+        """Rule out every placement that covers any of cells (a boolean cell mask)"""
+        for length, layout in self.layouts.items():
+            dead = self.alive[length] & layout[:, cells].any(axis=1)
+            if dead.any():
+                self.alive[length] &= ~dead
+                self.hunt_heat -= self.afloat_count(length) * layout[dead].sum(axis=0)
+
+    def heatmap(self):
+        """Score per cell; already-shot cells score -1"""
+        heat = None
+        if self.open_hits.any():
+            # Target mode: only placements that run through open hits, weighted by how many they explain
+            heat = np.zeros(self.size * self.size, dtype=np.int64)
+            for length in {self.lengths[ship_id] for ship_id in self.afloat}:
+                layout = self.layouts[length]
+                covered = layout[:, self.open_hits].sum(axis=1)
+                chosen = self.alive[length] & (covered > 0)
+                if chosen.any():
+                    weights = covered[chosen] * self.TARGET_WEIGHT * self.afloat_count(length)
+                    heat += weights @ layout[chosen]
+            heat[self.shot] = -1
+            if heat.max() <= 0:
+                heat = None  # Hits we can't explain any more; fall back to hunting
+        if heat is None:
+            heat = self.hunt_heat.copy()
+            heat[self.shot] = -1
+        return heat
+
+    def choose_shot(self):
+        """Return the (x, y) to fire at next"""
+        started = time.perf_counter()
+        heat = self.heatmap()
+        best = np.flatnonzero(heat == heat.max())
+        cell = int(self.rng.choice(best))
+        self.last_think = time.perf_counter() - started
+        return cell % self.size, cell // self.size
+
+    def record_shot(self, x, y, hit):
+        cell = y * self.size + x
+        self.shot[cell] = True
+        if hit:
+            self.open_hits[cell] = True
+        else:
+            mask = np.zeros(self.size * self.size, dtype=bool)
+            mask[cell] = True
+            self.block(mask)
+
+    def record_sunk(self, x, y, ship_id):
+        """The shot at (x, y) sank ship_id: retire it and the hits that belong to it"""
+        length = self.lengths[ship_id]
+        cell = y * self.size + x
+        layout = self.layouts[length]
+
+        # Which placement was it? One through the last shot made only of open hits
+        candidates = self.alive[length] & layout[:, cell] & ~(layout & ~self.open_hits).any(axis=1)
+        if candidates.any():
+            cells = layout[np.flatnonzero(candidates)[0]]
+        else:
+            cells = np.zeros(self.size * self.size, dtype=bool)
+            cells[cell] = True
+
+        self.hunt_heat -= layout[self.alive[length]].sum(axis=0)
+        self.afloat.remove(ship_id)
+        self.open_hits &= ~cells
+        # Nothing else can overlap a sunk ship
+        self.block(cells)
+
+    def observe(self, event):
+        """Feed the AI its own room events"""
+        if event.player != AI_PLAYER:
+            return
+        if event.kind == EV_SHOT:
+            self.record_shot(event.x, event.y, event.result)
+        elif event.kind == EV_SUNK:
+            self.record_sunk(event.x, event.y, event.result)
+
+
+class LocalGame:
+    """Single-player stand-in for Network: a Room on this machine with the AI as player 1.
+    The AI moves from latest(), on the render thread, so each move has to fit in a frame."""
+
+    MOVE_DELAY = 0.6  # Seconds between AI shots so the player can follow them
+
+    def __init__(self, seed=None):
+        self.room = Room(0)
+        self.room.join()
+        self.room.join()
+        self.ai = HeatmapAI(seed=seed)
+        self.connected = True
+        self.opponent_present = True
+        self.on_update = None  # Network compatibility; the AI moves on the render thread, so nothing to wake
+        self.p = self.room.players[0]
+        self.next_move = 0.0
+
+    def getP(self):
+        return self.p
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def shoot(self, x, y):
+        if self.room.shoot(0, x, y):
+            self.next_move = time.monotonic() + self.MOVE_DELAY
+
+    def latest(self):
+        self.update()
+        return self.room.players[0], self.room.players[1]
+
+    def update(self):
+        ai_game = self.room.players[AI_PLAYER]
+        if ai_game.winner is not None or ai_game.current_turn != AI_PLAYER:
+            return
+        now = time.monotonic()
+        if now < self.next_move:
+            return
+        x, y = self.ai.choose_shot()
+        self.room.shoot(AI_PLAYER, x, y)
+        # The AI reads the room's event log like a remote client would
+        for event in self.room.take_events(AI_PLAYER):
+            self.ai.observe(event)
+        self.next_move = now + self.MOVE_DELAY
@@ -0,0 +1,70 @@
+"""Compare the binary wire protocol against the old pickle path.
+
+Run from the repository root:  python benchmarks/bench_protocol.py
+"""
+import os
+import pickle
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protocol
+from engine import BattleshipsGame
+
+
+def make_game(player_id, shots):
+    """A game part way through a match, with `shots` shots fired and received"""
+    game = BattleshipsGame(player_id)
+    cells = [(x, y) for y in range(game.BOARD_SIZE) for x in range(game.BOARD_SIZE)]
+    random.shuffle(cells)
+    for x, y in cells[:shots]:
+        game.shoot(x, y)
+        game.update_opponent_board(x, y, random.random() < 0.3)
+    random.shuffle(cells)
+    for x, y in cells[:shots]:
+        game.receive_shot(x, y)
+    return game
+
+
+def bench(label, encode, decode, number):
+    data = encode()
+    enc = timeit.timeit(encode, number=number) / number * 1e6
+    dec = timeit.timeit(lambda: decode(data), number=number) / number * 1e6
+    print(f"  {label:<8} {len(data):>6} bytes  encode {enc:8.2f} us  decode {dec:8.2f} us")
+
+
+def main(number=2000):
+    random.seed(1)
+    for shots in (0, 30, 100):
+        own, opponent = make_game(0, shots), make_game(1, shots)
+        print(f"Full state after {shots} shots (connect / resync)")
+        bench("pickle", lambda: pickle.dumps((own, opponent)), pickle.loads, number)
+        bench("binary", lambda: protocol.encode_snapshot(shots, own, opponent),
+              lambda d: protocol.decode(protocol.MSG_SNAPSHOT, d[protocol.FRAME_HEADER.size:]), number)
+
+    # What one frame costs on the wire: the old path shipped the client's game up
+    # and both games back every frame, the new one a sync up and the new events back
+    own, opponent = make_game(0, 30), make_game(1, 30)
+    print("Idle frame, request")
+    bench("pickle", lambda: pickle.dumps(own), pickle.loads, number)
+    bench("binary", lambda: protocol.encode_sync(30),
+          lambda d: protocol.decode(protocol.MSG_SYNC, d[protocol.FRAME_HEADER.size:]), number)
+    print("Idle frame, reply")
+    bench("pickle", lambda: pickle.dumps((own, opponent)), pickle.loads, number)
+    bench("binary", lambda: protocol.encode_events([]),
+          lambda d: protocol.decode(protocol.MSG_EVENTS, d[protocol.FRAME_HEADER.size:]), number)
+    print("Shot command")
+    bench("pickle", lambda: pickle.dumps((3, 7)), pickle.loads, number)
+    bench("binary", lambda: protocol.encode_shoot(3, 7),
+          lambda d: protocol.decode(protocol.MSG_SHOOT, d[protocol.FRAME_HEADER.size:]), number)
+    print("Shot reply (miss + turn change)")
+    events = [protocol.Event(31, protocol.EV_SHOT, 0, 3, 7, 0), protocol.Event(32, protocol.EV_TURN, 1, 0, 0, 0)]
+    bench("pickle", lambda: pickle.dumps((own, opponent)), pickle.loads, number)
+    bench("binary", lambda: protocol.encode_events(events),
+          lambda d: protocol.decode(protocol.MSG_EVENTS, d[protocol.FRAME_HEADER.size:]), number)
+
+
+if __name__ == "__main__":
+    main()
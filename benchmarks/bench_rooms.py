@@ -0,0 +1,131 @@
+"""Hammer rooms from many threads and check that no shot or turn is lost or applied twice.
+
+Run from the repository root:  python benchmarks/bench_rooms.py --threads 8 --rooms 1 64
+
+Games are played in waves of --rooms rooms. Every thread repeatedly picks an unfinished room of
+the wave, looks at whose turn it is and fires that player at a random cell, racing the other
+threads for the same rooms. Three locking setups are compared: a lock per room (what Room
+does), one lock shared by every room, and no lock at all. Under the GIL the first two run at
+about the same speed; the point of the per-room lock is that it never becomes the bottleneck
+once rooms are driven from truly parallel threads.
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from protocol import EV_SHOT, EV_TURN, EV_GAME_OVER
+from room import Room
+
+SETUPS = ("per-room", "global", "none")
+
+
+def make_rooms(count, setup):
+    shared = threading.Lock()
+    rooms = []
+    for room_id in range(count):
+        if setup == "per-room":
+            lock = None
+        elif setup == "global":
+            lock = shared
+        else:
+            lock = contextlib.nullcontext()
+        room = Room(room_id, lock=lock)
+        room.join()
+        room.join()
+        rooms.append(room)
+    return rooms
+
+
+def hammer(rooms, accepted, seed):
+    """Fire random shots at random rooms until every game is over; count the ones accepted"""
+    rng = random.Random(seed)
+    live = list(range(len(rooms)))
+    while live:
+        index = live[rng.randrange(len(live))]
+        room = rooms[index]
+        player = room.players[0].current_turn
+        if room.players[player].winner is not None:
+            live.remove(index)
+            continue
+        if room.shoot(player, rng.randrange(10), rng.randrange(10)):
+            accepted[index] += 1
+
+
+def check(room, accepted):
+    """List of problems with a room's event log and state"""
+    problems = []
+    shots = [event for event in room.events if event.kind == EV_SHOT]
+    if len(shots) != accepted:
+        problems.append(f"room {room.room_id}: {accepted} shots accepted but {len(shots)} logged")
+    if [event.seq for event in room.events] != list(range(1, room.seq + 1)):
+        problems.append(f"room {room.room_id}: event seqs are not 1..{room.seq}")
+    for player in (0, 1):
+        cells = [(event.x, event.y) for event in shots if event.player == player]
+        if len(cells) != len(set(cells)):
+            problems.append(f"room {room.room_id}: player {player} fired at a cell twice")
+        if len(room.players[player].shots_fired) != len(cells):
+            problems.append(f"room {room.room_id}: player {player} game and log disagree on shots")
+    # Replay the turn order from the log: a shot out of turn means a turn was lost
+    turn = 0
+    for event in room.events:
+        if event.kind == EV_SHOT and event.player != turn:
+            problems.append(f"room {room.room_id}: player {event.player} shot on player {turn}'s turn")
+            break
+        if event.kind == EV_TURN:
+            turn = event.player
+        elif event.kind == EV_GAME_OVER:
+            break
+    return problems
+
+
+def run(setup, threads, room_count, games):
+    problems = []
+    total = 0
+    elapsed = 0.0
+    seed = 0
+    for _ in range(max(1, games // room_count)):
+        rooms = make_rooms(room_count, setup)
+        counters = [[0] * room_count for _ in range(threads)]
+        workers = []
+        for counter in counters:
+            workers.append(threading.Thread(target=hammer, args=(rooms, counter, seed)))
+            seed += 1
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed += time.perf_counter() - start
+
+        for index, room in enumerate(rooms):
+            accepted = sum(counter[index] for counter in counters)
+            total += accepted
+            problems.extend(check(room, accepted))
+    print(f"  {setup:<9} {total / elapsed:>10.0f} shots/s  {len(problems):>4} problems")
+    for problem in problems[:3]:
+        print(f"            {problem}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room locking contention benchmark")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rooms", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--games", type=int, default=256, help="games per setup")
+    args = parser.parse_args()
+
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible to provoke races
+    for room_count in args.rooms:
+        print(f"{args.threads} threads, {room_count} room{'s' if room_count != 1 else ''}")
+        for setup in SETUPS:
+            run(setup, args.threads, room_count, args.games)
+
+
+if __name__ == "__main__":
+    main()
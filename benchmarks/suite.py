@@ -0,0 +1,396 @@
+"""Benchmark the engine, protocol, server and rendering hot paths and compare with a baseline.
+
+Run from the repository root:
+
+    python benchmarks/suite.py                    # run, save results.json, compare with baseline.json
+    python benchmarks/suite.py --save-baseline    # run and make this machine's numbers the baseline
+    python benchmarks/suite.py --only engine protocol
+
+Times are the best of several repeats (round trips: the median). Baseline times are scaled by a
+calibration loop timed in both runs, so a slower or faster machine does not look like a change.
+A timed metric more than --tolerance slower than that, and by more than --min-change in absolute
+terms, or a size metric that grew at all, is a regression and makes the exit status 1. The floor
+keeps sub-microsecond metrics, where a few nanoseconds of jitter are tens of percent, from failing
+the run on their own.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import protocol
+from engine import BattleshipsGame
+from placement import random_fleet
+
+BASELINE = os.path.join(HERE, "baseline.json")
+RESULTS = os.path.join(HERE, "results.json")
+LARGE_BOARD = 100  # Side of the sparse board in the large-board engine benchmark
+
+
+def make_game(player_id, shots, rng):
+    """A game part way through a match, with `shots` shots fired and received"""
+    game = BattleshipsGame(player_id)
+    game.auto_place_ships(rng)
+    cells = [(x, y) for y in range(game.BOARD_SIZE) for x in range(game.BOARD_SIZE)]
+    rng.shuffle(cells)
+    for x, y in cells[:shots]:
+        game.shoot(x, y)
+        game.update_opponent_board(x, y, rng.random() < 0.3)
+    rng.shuffle(cells)
+    for x, y in cells[:shots]:
+        game.receive_shot(x, y)
+    return game
+
+
+def best_time(run, repeat, per=1):
+    """Best seconds per operation over repeat calls of run(), which does per operations"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) / per)
+    return min(samples)
+
+
+def calibrate(repeat=15):
+    """Seconds for a fixed pure-Python workload; measures how fast this machine is right now"""
+    def work():
+        total = 0
+        for i in range(20000):
+            total += i * i % 7
+        return total
+    return best_time(work, repeat)
+
+
+def us(seconds):
+    return round(seconds * 1e6, 3), "us"
+
+
+def bench_engine(repeat):
+    rng = random.Random(1)
+    size = BattleshipsGame.BOARD_SIZE
+    cells = [(x, y) for y in range(size) for x in range(size)]
+    results = {}
+
+    def fresh_games(count=50):
+        games = []
+        for _ in range(count):
+            game = BattleshipsGame(0)
+            game.auto_place_ships(rng)
+            games.append(game)
+        return games
+
+    # Every cell of a whole board, so hits, misses and sinks are all in the mix
+    def receive(games):
+        for game in games:
+            for x, y in cells:
+                game.receive_shot(x, y)
+
+    def shoot(games):
+        for game in games:
+            for x, y in cells:
+                game.shoot(x, y)
+
+    for name, run in (("engine.receive_shot", receive), ("engine.shoot", shoot)):
+        samples = []
+        for _ in range(repeat):
+            games = fresh_games()
+            start = time.perf_counter()
+            run(games)
+            samples.append((time.perf_counter() - start) / (len(games) * len(cells)))
+        results[name] = us(min(samples))
+
+    game = BattleshipsGame(0)  # place_fleet starts from an empty board every time
+    results["engine.auto_place_ships"] = us(best_time(
+        lambda: [game.auto_place_ships(rng) for _ in range(200)], repeat, 200))
+
+    # Large boards are sparse; every ship cell is hit twice, since players re-click cells they already hit
+    samples = []
+    for _ in range(repeat):
+        game = BattleshipsGame(0, size=LARGE_BOARD)
+        ship_cells = [(cell % LARGE_BOARD, cell // LARGE_BOARD) for cell in game.ship_at]
+        volley = ship_cells + [(rng.randrange(LARGE_BOARD), rng.randrange(LARGE_BOARD)) for _ in ship_cells]
+        start = time.perf_counter()
+        for x, y in volley:
+            game.resolve_shot(x, y)
+        repeats = [game.resolve_shot(x, y) for x, y in ship_cells]
+        samples.append((time.perf_counter() - start) / (len(volley) + len(ship_cells)))
+        if not all(result.hit and result.sunk is None for result in repeats):
+            raise RuntimeError("Shooting a hit cell again on a sparse board did not report the old hit")
+    results["engine.receive_shot_sparse"] = us(min(samples))
+
+    # A fleet that cannot fit has to be reported, not searched for forever
+    def impossible_fleet():
+        try:
+            random_fleet(7, [3] * 16, rng)
+        except ValueError:
+            return
+        raise RuntimeError("random_fleet placed 16 ships of 3 on a 7x7 board")
+    results["engine.impossible_fleet"] = us(best_time(impossible_fleet, 1))
+    return results
+
+
+def bench_protocol(repeat):
+    rng = random.Random(2)
+    results = {}
+    header = protocol.FRAME_HEADER.size
+    own, opponent = make_game(0, 30, rng), make_game(1, 30, rng)
+    events = [protocol.Event(31, protocol.EV_SHOT, 0, 3, 7, 0), protocol.Event(32, protocol.EV_TURN, 1, 0, 0, 0)]
+    frames = {
+        "snapshot": (protocol.MSG_SNAPSHOT, lambda: protocol.encode_snapshot(30, own, opponent)),
+        "events": (protocol.MSG_EVENTS, lambda: protocol.encode_events(events)),
+        "shoot": (protocol.MSG_SHOOT, lambda: protocol.encode_shoot(3, 7)),
+        "sync": (protocol.MSG_SYNC, lambda: protocol.encode_sync(30)),
+    }
+    for name, (msg_type, encode) in frames.items():
+        data = encode()
+        results[f"protocol.{name}.bytes"] = (len(data), "bytes")
+        results[f"protocol.{name}.encode"] = us(best_time(
+            lambda: [encode() for _ in range(2000)], repeat, 2000))
+        payload = data[header:]
+        results[f"protocol.{name}.decode"] = us(best_time(
+            lambda: [protocol.decode(msg_type, payload) for _ in range(2000)], repeat, 2000))
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_server(repeat, rounds=200):
+    """Round trips through a real GameServer over loopback"""
+    import server
+
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(server.GameServer().serve("127.0.0.1", port, None, 0),), daemon=True)
+    thread.start()
+
+    def connect():
+        for _ in range(100):
+            try:
+                sock = socket.create_connection(("127.0.0.1", port))
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.02)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(protocol.encode_hello())
+        protocol.recv_message(sock)  # Session
+        protocol.recv_message(sock)  # Snapshot
+        return sock
+
+    def round_trip(sock, data):
+        start = time.perf_counter()
+        sock.sendall(data)
+        _, events = protocol.recv_message(sock)
+        return time.perf_counter() - start, events
+
+    sync_times = []
+    shot_times = []
+    while len(shot_times) < rounds * repeat:
+        socks = [connect(), connect()]
+        protocol.recv_message(socks[0])  # Player 1 arriving, pushed to player 0
+        cells = [[(x, y) for y in range(10) for x in range(10)] for _ in socks]
+        for order in cells:
+            random.shuffle(order)
+        # Fresh room, so seq 0 is current and each sync is answered with an empty event list
+        for _ in range(rounds):
+            sync_times.append(round_trip(socks[0], protocol.encode_sync(0))[0])
+        turn = 0
+        over = False
+        while not over and cells[turn]:
+            elapsed, events = round_trip(socks[turn], protocol.encode_shoot(*cells[turn].pop()))
+            shot_times.append(elapsed)
+            protocol.recv_message(socks[1 - turn])  # The same events, pushed to the opponent
+            for event in events:
+                if event.kind == protocol.EV_TURN:
+                    turn = event.player
+                elif event.kind == protocol.EV_GAME_OVER:
+                    over = True
+        for sock in socks:
+            sock.close()
+
+    # The server thread is a daemon and goes away with the process
+    return {
+        "server.shot_round_trip": us(statistics.median(shot_times)),
+        "server.sync_round_trip": us(statistics.median(sync_times)),
+    }
+
+
+def bench_render(repeat, frames=120):
+    import pygame
+    import client
+    from menu import Menu
+
+    pygame.init()
+    rng = random.Random(3)
+    win = pygame.display.set_mode((client.width, client.height))
+    client.init_font()
+    own, opponent = make_game(0, 30, rng), make_game(1, 30, rng)
+    results = {}
+
+    def redraw():
+        for t in range(frames):
+            client.redrawWindow(win, own, opponent, (4, 4), t)
+
+    renderer = client.DirtyRenderer()
+    renderer.render(win, own, opponent, (4, 4), 0)
+
+    def dirty():
+        for t in range(frames):
+            # Hover moving between two cells, the common case while aiming
+            renderer.render(win, own, opponent, (t % 2, 4), t)
+
+    results["render.redrawWindow"] = us(best_time(redraw, repeat, frames))
+    results["render.dirty_frame"] = us(best_time(dirty, repeat * 3, frames))  # Short frames need more tries
+
+    # Menu.run uncapped until a timer quits it, counting the frames it drew
+    samples = []
+    for _ in range(repeat):
+        menu = Menu(client.width, client.height)
+        menu.FPS = 0
+        pygame.event.clear()
+        pygame.time.set_timer(pygame.QUIT, 300, 1)
+        start = time.perf_counter()
+        menu.run()
+        samples.append((time.perf_counter() - start) / max(1, menu.scheduler.total_frames))
+    results["render.menu_frame"] = us(min(samples))
+    pygame.quit()
+    return results
+
+
+GROUPS = {
+    "engine": bench_engine,
+    "protocol": bench_protocol,
+    "server": bench_server,
+    "render": bench_render,
+}
+
+
+def run_worker(group, repeat, output):
+    """Body of one worker process: run a group and write its results and calibration as JSON"""
+    calibration = calibrate()
+    results = GROUPS[group](repeat)
+    with open(output, "w") as f:
+        json.dump({"calibration": min(calibration, calibrate()), "results": results}, f)
+
+
+def run_group(group, repeat, processes):
+    """Run a group in fresh processes and keep the best of each metric.
+    Speed varies from one interpreter to the next (hash seed, memory layout), so one process is not enough."""
+    results = {}
+    calibration = None
+    for _ in range(processes):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "worker.json")
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", group,
+                            "--repeat", str(repeat), "--output", output],
+                           check=True, stdout=subprocess.DEVNULL)
+            with open(output) as f:
+                worker = json.load(f)
+        calibration = worker["calibration"] if calibration is None else min(calibration, worker["calibration"])
+        for name, (value, unit) in worker["results"].items():
+            if name not in results or value < results[name][0]:
+                results[name] = (value, unit)
+    return results, calibration
+
+
+def compare(results, baseline, tolerance, scale=1.0, min_change=0.0):
+    """Print a table against the baseline, its times multiplied by scale; return the names of regressed metrics.
+    A time regresses only if it is both tolerance (relative) and min_change (absolute, same unit) slower."""
+    regressions = []
+    print(f"{'metric':<32} {'value':>12} {'baseline':>12} {'change':>9}")
+    for name, (value, unit) in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32} {value:>9} {unit:<2} {'-':>12} {'new':>9}")
+            continue
+        base_value = base[0] if unit == "bytes" else round(base[0] * scale, 3)
+        change = (value - base_value) / base_value if base_value else 0.0
+        if unit == "bytes":
+            regressed = value > base_value
+        else:
+            regressed = change > tolerance and value - base_value > min_change
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<32} {value:>9} {unit:<2} {base_value:>9} {unit:<2} {change:>+8.1%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(GROUPS), help="run just these groups")
+    parser.add_argument("--repeat", type=int, default=7, help="repeats per measurement (the best is kept)")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown before a time counts as a regression")
+    parser.add_argument("--min-change", type=float, default=0.1,
+                        help="microseconds a time must also slow down by to count, so jitter on tiny metrics is ignored")
+    parser.add_argument("--output", default=RESULTS, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline instead of comparing")
+    parser.add_argument("--processes", type=int, default=3, help="fresh processes per group (the best is kept)")
+    parser.add_argument("--worker", choices=sorted(GROUPS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.repeat, args.output)
+        return 0
+
+    results = {}
+    calibration = None
+    for group in args.only or GROUPS:
+        print(f"Running {group} benchmarks...")
+        group_results, group_calibration = run_group(group, args.repeat, args.processes)
+        results.update(group_results)
+        calibration = group_calibration if calibration is None else min(calibration, group_calibration)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calibration": us(calibration),
+        "results": results,
+    }
+    path = args.baseline if args.save_baseline else args.output
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {path}")
+    if args.save_baseline:
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    # Shared and throttled machines drift; scale the baseline times to how fast this one is today
+    scale = report["calibration"][0] / baseline["calibration"][0]
+    print(f"Machine speed relative to baseline: {1 / scale:.2f}x")
+    regressions = compare(results, baseline["results"], args.tolerance, scale, args.min_change)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# Cell codes used by the list-of-lists boards the rest of the game was written against
+EMPTY = 0
+SHIP = 1
+HIT = 2
+MISS = -1
+
+DENSE_MAX = 32  # Boards up to this size are bitmasks; bigger ones store sets of cell indices
+
+
+def make_board(size):
+    """Bitmask board for normal sizes, sparse one for large-board matches"""
+    return Board(size) if size <= DENSE_MAX else SparseBoard(size)
+
+
+class Board:
+    """One square board stored as three integer bitmasks; cell (x, y) is bit y * size + x"""
+
+    def __init__(self, size):
+        self.size = size
+        self.ships = 0
+        self.hits = 0
+        self.misses = 0
+
+    def bit(self, x, y):
+        return 1 << (y * self.size + x)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def ship_mask(self, x, y, length, horizontal):
+        """Mask covering a ship; the caller checks it fits on the board"""
+        if horizontal:
+            return ((1 << length) - 1) << (y * self.size + x)
+        mask = 0
+        bit = self.bit(x, y)
+        for _ in range(length):
+            mask |= bit
+            bit <<= self.size
+        return mask
+
+    def fits(self, x, y, length, horizontal):
+        if x < 0 or y < 0:
+            return False
+        if horizontal:
+            return x + length <= self.size and y < self.size
+        return y + length <= self.size and x < self.size
+
+    def overlaps(self, mask):
+        return bool(self.ships & mask)
+
+    def add_ship(self, mask):
+        self.ships |= mask
+
+    def clear_ships(self):
+        self.ships = 0
+
+    def hit_at(self, index):
+        """Whether cell index (y * size + x) has been hit"""
+        return bool(self.hits >> index & 1)
+
+    def is_shot(self, bit):
+        return bool((self.hits | self.misses) & bit)
+
+    def is_hit(self, bit):
+        return bool(self.hits & bit)
+
+    def mark(self, bit, hit):
+        if hit:
+            self.hits |= bit
+        else:
+            self.misses |= bit
+
+    def snapshot(self):
+        """Copy that later shots leave alone; the masks are immutable ints, so nothing is copied"""
+        board = Board(self.size)
+        board.ships, board.hits, board.misses = self.ships, self.hits, self.misses
+        return board
+
+    def cell(self, x, y):
+        """Legacy cell code: 2 hit, -1 miss, 1 ship, 0 empty"""
+        bit = self.bit(x, y)
+        if self.hits & bit:
+            return HIT
+        if self.misses & bit:
+            return MISS
+        if self.ships & bit:
+            return SHIP
+        return EMPTY
+
+    def rows(self):
+        """Read-only board[y][x] view for code that still indexes boards as lists"""
+        return BoardView(self)
+
+
+class SparseBoard(Board):
+    """Board with the same interface whose ships, hits and misses are sets of cell indices.
+    Memory follows the number of ships and shots, not the area, so 1000x1000 boards are cheap.
+    A "bit" here is a cell index and a "mask" a frozenset of them."""
+
+    def __init__(self, size):
+        self.size = size
+        self.ships = set()
+        self.hits = set()
+        self.misses = set()
+
+    def bit(self, x, y):
+        return y * self.size + x
+
+    def ship_mask(self, x, y, length, horizontal):
+        start = y * self.size + x
+        step = 1 if horizontal else self.size
+        return frozenset(range(start, start + step * length, step))
+
+    def overlaps(self, mask):
+        return not self.ships.isdisjoint(mask)
+
+    def add_ship(self, mask):
+        self.ships.update(mask)
+
+    def clear_ships(self):
+        self.ships = set()
+
+    def hit_at(self, index):
+        return index in self.hits
+
+    def is_shot(self, bit):
+        return bit in self.hits or bit in self.misses
+
+    def is_hit(self, bit):
+        return bit in self.hits
+
+    def mark(self, bit, hit):
+        if hit:
+            self.hits.add(bit)
+        else:
+            self.misses.add(bit)
+
+    def snapshot(self):
+        """Copy of the shots only: the ship cells are shared, since only placing ships changes them"""
+        board = SparseBoard(self.size)
+        board.ships = self.ships
+        board.hits = set(self.hits)
+        board.misses = set(self.misses)
+        return board
+
+    def cell(self, x, y):
+        index = y * self.size + x
+        if index in self.hits:
+            return HIT
+        if index in self.misses:
+            return MISS
+        if index in self.ships:
+            return SHIP
+        return EMPTY
+
+
+class BoardView:
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.size
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.board.size:
+            raise IndexError(y)
+        return RowView(self.board, y)
+
+    def __iter__(self):
+        for y in range(self.board.size):
+            yield RowView(self.board, y)
+
+    def __eq__(self, other):
+        return [list(row) for row in self] == [list(row) for row in other]
+
+
+class RowView:
+    def __init__(self, board, y):
+        self.board = board
+        self.y = y
+
+    def __len__(self):
+        return self.board.size
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.board.size:
+            raise IndexError(x)
+        return self.board.cell(x, self.y)
+
+    def __iter__(self):
+        for x in range(self.board.size):
+            yield self.board.cell(x, self.y)
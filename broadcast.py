@@ -0,0 +1,117 @@
+"""Live fan-out of a room's events to spectators.
+
+Each update is encoded once and the same bytes object is written to every viewer, so a viewer
+costs one non-blocking socket write per update rather than an encode. The transport's outgoing
+buffer is the viewer's queue, bounded by SPECTATOR_BUFFER: a viewer whose buffer is over the
+limit misses updates and is skipped ahead to a fresh snapshot as soon as it has drained, and one
+who falls behind too often or for too long is dropped. Nothing a viewer does can make the players wait.
+"""
+import asyncio
+import time
+import protocol
+
+SPECTATOR_BUFFER = 64 * 1024  # Unsent bytes a viewer may have queued before updates skip them
+MAX_SKIPS = 3  # Times a viewer may fall behind before being dropped
+MAX_MISSED = 64  # Updates a viewer may miss in one go before being dropped
+
+
+class Spectator:
+    """One viewer's connection"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        # Past SPECTATOR_BUFFER the transport pauses, so drain() waits for the backlog to clear
+        writer.transport.set_write_buffer_limits(high=SPECTATOR_BUFFER)
+        self.behind = False  # Missed updates; the next write is a snapshot
+        self.catch_up = None  # Task waiting to send that snapshot
+        self.skips = 0
+        self.missed = 0
+
+    def backlog(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    def send(self, data):
+        self.writer.write(data)  # Never blocks; whatever the socket won't take now waits in the transport
+
+    def close(self):
+        self.writer.close()  # The spectator's read loop then sees EOF and cleans up
+
+
+class Broadcast:
+    """The spectators of one room and the last seq they were sent"""
+
+    def __init__(self, room, metrics):
+        self.room = room
+        self.metrics = metrics
+        self.spectators = set()
+        self.seq = room.seq
+        self.cached = None  # (seq, encoded snapshot), shared by everyone joining or skipping at that seq
+        self.scheduled = False
+
+    def snapshot(self):
+        if self.cached is None or self.cached[0] != self.room.seq:
+            self.cached = (self.room.seq, self.room.view())
+        return self.cached[1]
+
+    def add(self, spectator):
+        self.spectators.add(spectator)
+        self.send(spectator, self.snapshot())
+
+    def remove(self, spectator):
+        self.spectators.discard(spectator)
+
+    def send(self, spectator, data):
+        spectator.send(data)
+        self.metrics.spectator_sent(len(data))
+
+    def schedule(self):
+        """Publish on the next turn of the loop, once however many events are logged before then;
+        by then the reply to the player whose command made them has been written"""
+        if not self.scheduled:
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.publish)
+
+    def publish(self):
+        """Send every spectator the events since the last publish, encoded once"""
+        self.scheduled = False
+        events = self.room.events_since(self.seq)
+        if not events or not self.spectators:
+            self.seq = self.room.seq
+            return
+        started = time.perf_counter()
+        self.seq = events[-1].seq
+        data = protocol.encode_events(events)
+        for spectator in list(self.spectators):
+            if spectator.behind or spectator.backlog() > SPECTATOR_BUFFER:
+                self.fall_behind(spectator)
+            else:
+                self.send(spectator, data)
+        self.metrics.time("broadcast", time.perf_counter() - started)
+
+    def fall_behind(self, spectator):
+        if not spectator.behind:
+            spectator.behind = True
+            spectator.skips += 1
+            spectator.missed = 0
+            spectator.catch_up = asyncio.ensure_future(self.catch_up(spectator))
+        spectator.missed += 1
+        if spectator.skips > MAX_SKIPS or spectator.missed > MAX_MISSED:
+            self.metrics.spectator_drops += 1
+            self.remove(spectator)
+            spectator.close()
+
+    async def catch_up(self, spectator):
+        """Once a lagging viewer's backlog has drained, send the events it missed as one snapshot"""
+        try:
+            await spectator.writer.drain()
+        except ConnectionError:
+            return  # Gone; its read loop cleans up
+        if spectator.behind and spectator in self.spectators:
+            spectator.behind = False
+            self.metrics.spectator_skips += 1
+            self.send(spectator, self.snapshot())
+
+    def close(self):
+        for spectator in list(self.spectators):
+            spectator.close()
+        self.spectators.clear()
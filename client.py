@@ -1,8 +1,12 @@
 import pygame
 from network import Network
-from player import BattleshipsGame
-from menu import Menu
-import math
+from ai import LocalGame
+from player import BattleshipsGame, CELL_SIZE, draw_board, draw_cell, draw_grid
+from menu import Menu, MODE_AI
+from frames import FrameScheduler, ANIMATION_RATE
+from render_cache import LAYERS, TEXT, draw_gradient
+from particles import victory_particles, loser_particles
+from viewport import Viewport, draw_board_view, draw_position
 
 width = 900
 height = 520
@@ -19,6 +23,11 @@ COLOR_TEXT = (226, 232, 240)
 COLOR_TEXT_BRIGHT = (255, 255, 255)
 COLOR_HOVER = (94, 234, 212)     # Cyan for hover
 
+# Redraw only what changed each frame; set to False to always repaint the whole window
+DIRTY_RECTS = True
+# The window was uncovered, restored or shown again, so the dirty-rect renderer has to repaint all of it
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN)
+
 FONT = None
 FONT_LARGE = None
 FONT_NORMAL = None
@@ -32,14 +41,9 @@ def init_font():
     FONT_NORMAL = pygame.font.Font(None, 28)
     FONT_VICTORY = pygame.font.Font(None, 56)
 
-def draw_gradient_background(surface, width, height):
-    """Draw gradient background"""
-    for y in range(height):
-        ratio = y / height
-        r = int(COLOR_BG[0] * (1 - ratio) + COLOR_BG_GRADIENT[0] * ratio)
-        g = int(COLOR_BG[1] * (1 - ratio) + COLOR_BG_GRADIENT[1] * ratio)
-        b = int(COLOR_BG[2] * (1 - ratio) + COLOR_BG_GRADIENT[2] * ratio)
-        pygame.draw.line(surface, (r, g, b), (0, y), (width, y))
+def current_theme():
+    """Colors baked into the cached layers; a change here rebuilds them"""
+    return (COLOR_BG, COLOR_BG_GRADIENT, COLOR_PANEL, COLOR_GRID, COLOR_TEXT_BRIGHT)
 
 def draw_label(surface, text, pos, size=24, color=COLOR_TEXT, shadow=True):
     if size == 36:
@@ -49,22 +53,24 @@ def draw_label(surface, text, pos, size=24, color=COLOR_TEXT, shadow=True):
     else:
         font = FONT
     
-    if shadow:
-        shadow_surf = font.render(text, True, (0, 0, 0))
-        surface.blit(shadow_surf, (pos[0] + 2, pos[1] + 2))
-    
-    text_surf = font.render(text, True, color)
-    surface.blit(text_surf, pos)
+    # Text and shadow are rasterized once and reused from the cache
+    surface.blit(TEXT.label(font, text, color, shadow=2 if shadow else 0), pos)
 
-def redrawWindow(win, player, opponent, hover_cell=None, game_time=0):
-    draw_gradient_background(win, width, height)
-    
+def board_panels():
+    """Rects of the own fleet, enemy waters and stats panels"""
     # Panels with rounded corners (moved down to make space for turn status)
     panel_top = 75
-    own_panel = pygame.Rect(20, panel_top, BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE + 20,
-                            BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE + 60)
-    opp_panel = pygame.Rect(width // 2 + 10, panel_top, BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE + 20,
-                            BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE + 60)
+    own_panel = pygame.Rect(20, panel_top, BattleshipsGame.BOARD_SIZE * CELL_SIZE + 20,
+                            BattleshipsGame.BOARD_SIZE * CELL_SIZE + 60)
+    opp_panel = pygame.Rect(width // 2 + 10, panel_top, BattleshipsGame.BOARD_SIZE * CELL_SIZE + 20,
+                            BattleshipsGame.BOARD_SIZE * CELL_SIZE + 60)
+    stats_panel = pygame.Rect(20, own_panel.bottom + 15, width - 40, 60)
+    return own_panel, opp_panel, stats_panel
+
+def draw_static_layer(win):
+    """Everything on the game screen that stays the same for a whole match"""
+    draw_gradient(win, COLOR_BG, COLOR_BG_GRADIENT)
+    own_panel, opp_panel, stats_panel = board_panels()
     
     # Panel glow effect
     for i in range(3):
@@ -85,114 +91,11 @@ def redrawWindow(win, player, opponent, hover_cell=None, game_time=0):
     draw_label(win, "Your Fleet", (own_panel.x + 15, own_panel.y + 12), size=28, color=COLOR_TEXT_BRIGHT)
     draw_label(win, "Enemy Waters", (opp_panel.x + 15, opp_panel.y + 12), size=28, color=COLOR_TEXT_BRIGHT)
     
-    # Own board
-    player.draw(win, own_panel.x + 10, own_panel.y + 45, show_ships=True)
-    
-    # Opponent board grid
-    offset_x = opp_panel.x + 10
-    offset_y = opp_panel.y + 45
-    
-    # Draw grid with glow
-    for i in range(BattleshipsGame.BOARD_SIZE + 1):
-        # Vertical lines
-        pygame.draw.line(
-            win, COLOR_GRID,
-            (offset_x + i * BattleshipsGame.CELL_SIZE, offset_y),
-            (offset_x + i * BattleshipsGame.CELL_SIZE, offset_y + BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE), 2
-        )
-        # Horizontal lines
-        pygame.draw.line(
-            win, COLOR_GRID,
-            (offset_x, offset_y + i * BattleshipsGame.CELL_SIZE),
-            (offset_x + BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE, offset_y + i * BattleshipsGame.CELL_SIZE), 2
-        )
-    
-    # Hover highlight on opponent board
-    if hover_cell:
-        hx, hy = hover_cell
-        if 0 <= hx < BattleshipsGame.BOARD_SIZE and 0 <= hy < BattleshipsGame.BOARD_SIZE:
-            if player.opponent_board[hy][hx] == 0:
-                rect = pygame.Rect(
-                    offset_x + hx * BattleshipsGame.CELL_SIZE + 1,
-                    offset_y + hy * BattleshipsGame.CELL_SIZE + 1,
-                    BattleshipsGame.CELL_SIZE - 2,
-                    BattleshipsGame.CELL_SIZE - 2,
-                )
-                # Glow effect
-                for i in range(3):
-                    glow_rect = pygame.Rect(
-                        rect.x - i, rect.y - i,
-                        rect.width + i * 2, rect.height + i * 2
-                    )
-                    glow_color = tuple(min(255, c + (3-i) * 20) for c in COLOR_HOVER[:3])
-                    pygame.draw.rect(win, glow_color, glow_rect, width=1, border_radius=4)
-                pygame.draw.rect(win, COLOR_HOVER, rect, width=2, border_radius=4)
-    
-    # Draw hits and misses on opponent board
-    for y in range(BattleshipsGame.BOARD_SIZE):
-        for x in range(BattleshipsGame.BOARD_SIZE):
-            cell_x = offset_x + x * BattleshipsGame.CELL_SIZE + 1
-            cell_y = offset_y + y * BattleshipsGame.CELL_SIZE + 1
-            cell_rect = pygame.Rect(cell_x, cell_y, BattleshipsGame.CELL_SIZE - 2, BattleshipsGame.CELL_SIZE - 2)
-            
-            if player.opponent_board[y][x] == 2:
-                # Hit with glow
-                for i in range(2):
-                    glow_rect = pygame.Rect(
-                        cell_rect.x - i, cell_rect.y - i,
-                        cell_rect.width + i * 2, cell_rect.height + i * 2
-                    )
-                    glow_color = tuple(min(255, c + (2-i) * 30) for c in COLOR_HIT[:3])
-                    pygame.draw.rect(win, glow_color, glow_rect, border_radius=4)
-                pygame.draw.rect(win, COLOR_HIT, cell_rect, border_radius=4)
-                pygame.draw.circle(win, COLOR_TEXT_BRIGHT,
-                                 (cell_x + BattleshipsGame.CELL_SIZE // 2, cell_y + BattleshipsGame.CELL_SIZE // 2),
-                                 BattleshipsGame.CELL_SIZE // 4)
-            elif player.opponent_board[y][x] == -1:
-                # Miss
-                pygame.draw.rect(win, COLOR_PANEL, cell_rect, border_radius=4)
-                pygame.draw.circle(win, COLOR_MISS,
-                                 (cell_x + BattleshipsGame.CELL_SIZE // 2, cell_y + BattleshipsGame.CELL_SIZE // 2),
-                                 BattleshipsGame.CELL_SIZE // 5)
-    
-    # Turn status (placed between panels at top)
-    if not player.game_over and (not opponent or not opponent.game_over):
-        if player.current_turn == player.player_id:
-            turn_text = "Si na rade!"
-            turn_color = COLOR_HOVER
-        else:
-            turn_text = "Čakáš na súpera"
-            turn_color = COLOR_MISS
-        
-        # Turn status panel
-        turn_panel_width = 250
-        turn_panel_height = 45
-        turn_panel = pygame.Rect(width // 2 - turn_panel_width // 2, 20, turn_panel_width, turn_panel_height)
-        
-        # Glow effect
-        for i in range(3):
-            glow_turn = pygame.Rect(
-                turn_panel.x - i, turn_panel.y - i,
-                turn_panel.width + i * 2, turn_panel.height + i * 2
-            )
-            glow_color = tuple(min(255, c + (3-i) * 8) for c in turn_color[:3])
-            pygame.draw.rect(win, glow_color, glow_turn, border_radius=10 + i)
-        
-        pygame.draw.rect(win, COLOR_PANEL, turn_panel, border_radius=10)
-        pygame.draw.rect(win, turn_color, turn_panel, width=2, border_radius=10)
-        
-        # Turn text
-        turn_surf = FONT_NORMAL.render(turn_text, True, turn_color)
-        turn_rect = turn_surf.get_rect(center=turn_panel.center)
-        shadow_turn = FONT_NORMAL.render(turn_text, True, (0, 0, 0))
-        win.blit(shadow_turn, (turn_rect.x + 2, turn_rect.y + 2))
-        win.blit(turn_surf, turn_rect)
+    # Board grids
+    draw_grid(win, own_panel.x + 10, own_panel.y + 45, COLOR_GRID)
+    draw_grid(win, opp_panel.x + 10, opp_panel.y + 45, COLOR_GRID)
     
     # Stats panel (bottom, improved styling)
-    stats_y = own_panel.bottom + 15
-    stats_panel = pygame.Rect(20, stats_y, width - 40, 60)
-    
-    # Panel glow effect
     for i in range(3):
         glow_stats = pygame.Rect(
             stats_panel.x - i, stats_panel.y - i,
@@ -208,7 +111,91 @@ def redrawWindow(win, player, opponent, hover_cell=None, game_time=0):
     highlight_stats = pygame.Rect(stats_panel.x + 2, stats_panel.y + 2, stats_panel.width - 4, 25)
     highlight_color = tuple(min(255, c + 10) for c in COLOR_PANEL[:3])
     pygame.draw.rect(win, highlight_color, highlight_stats, border_radius=8)
+
+def board_offsets():
+    """Top-left pixel of the own and opponent boards"""
+    own_panel, opp_panel, _ = board_panels()
+    return (own_panel.x + 10, own_panel.y + 45), (opp_panel.x + 10, opp_panel.y + 45)
+
+def turn_panel_rect():
+    turn_panel_width = 250
+    turn_panel_height = 45
+    return pygame.Rect(width // 2 - turn_panel_width // 2, 20, turn_panel_width, turn_panel_height)
+
+def draw_opponent_cell(win, player, offset_x, offset_y, x, y, hovered=False):
+    """Draw one cell of the opponent board, including the hover highlight"""
+    cell_x = offset_x + x * CELL_SIZE + 1
+    cell_y = offset_y + y * CELL_SIZE + 1
+    cell_rect = pygame.Rect(cell_x, cell_y, CELL_SIZE - 2, CELL_SIZE - 2)
+    cell = player.opponent_bitboard.cell(x, y)
+    
+    if hovered and cell == 0:
+        # Glow effect
+        for i in range(3):
+            glow_rect = pygame.Rect(
+                cell_rect.x - i, cell_rect.y - i,
+                cell_rect.width + i * 2, cell_rect.height + i * 2
+            )
+            glow_color = tuple(min(255, c + (3-i) * 20) for c in COLOR_HOVER[:3])
+            pygame.draw.rect(win, glow_color, glow_rect, width=1, border_radius=4)
+        pygame.draw.rect(win, COLOR_HOVER, cell_rect, width=2, border_radius=4)
+    elif cell == 2:
+        # Hit with glow
+        for i in range(2):
+            glow_rect = pygame.Rect(
+                cell_rect.x - i, cell_rect.y - i,
+                cell_rect.width + i * 2, cell_rect.height + i * 2
+            )
+            glow_color = tuple(min(255, c + (2-i) * 30) for c in COLOR_HIT[:3])
+            pygame.draw.rect(win, glow_color, glow_rect, border_radius=4)
+        pygame.draw.rect(win, COLOR_HIT, cell_rect, border_radius=4)
+        pygame.draw.circle(win, COLOR_TEXT_BRIGHT,
+                         (cell_x + CELL_SIZE // 2, cell_y + CELL_SIZE // 2),
+                         CELL_SIZE // 4)
+    elif cell == -1:
+        # Miss
+        pygame.draw.rect(win, COLOR_PANEL, cell_rect, border_radius=4)
+        pygame.draw.circle(win, COLOR_MISS,
+                         (cell_x + CELL_SIZE // 2, cell_y + CELL_SIZE // 2),
+                         CELL_SIZE // 5)
+
+def is_game_over(player, opponent):
+    return player.game_over or bool(opponent and opponent.game_over)
+
+def draw_turn_banner(win, player, opponent):
+    """Turn status (placed between panels at top)"""
+    if is_game_over(player, opponent):
+        return
+    if player.current_turn == player.player_id:
+        turn_text = "Si na rade!"
+        turn_color = COLOR_HOVER
+    else:
+        turn_text = "Čakáš na súpera"
+        turn_color = COLOR_MISS
+    
+    # Turn status panel
+    turn_panel = turn_panel_rect()
     
+    # Glow effect
+    for i in range(3):
+        glow_turn = pygame.Rect(
+            turn_panel.x - i, turn_panel.y - i,
+            turn_panel.width + i * 2, turn_panel.height + i * 2
+        )
+        glow_color = tuple(min(255, c + (3-i) * 8) for c in turn_color[:3])
+        pygame.draw.rect(win, glow_color, glow_turn, border_radius=10 + i)
+    
+    pygame.draw.rect(win, COLOR_PANEL, turn_panel, border_radius=10)
+    pygame.draw.rect(win, turn_color, turn_panel, width=2, border_radius=10)
+    
+    # Turn text
+    turn_surf = TEXT.render(FONT_NORMAL, turn_text, turn_color)
+    turn_rect = turn_surf.get_rect(center=turn_panel.center)
+    shadow_turn = TEXT.render(FONT_NORMAL, turn_text, (0, 0, 0))
+    win.blit(shadow_turn, (turn_rect.x + 2, turn_rect.y + 2))
+    win.blit(turn_surf, turn_rect)
+
+def draw_stats(win, player, opponent, stats_panel):
     # Stats text with better spacing
     stats_spacing = 180
     draw_label(win, f"Výstrely: {len(player.shots_fired)}", (stats_panel.x + 25, stats_panel.y + 20), size=24)
@@ -217,95 +204,237 @@ def redrawWindow(win, player, opponent, hover_cell=None, game_time=0):
     if opponent:
         draw_label(win, f"Súper - Výstrely: {len(opponent.shots_fired)}", (stats_panel.x + 25 + stats_spacing * 2, stats_panel.y + 20), size=24)
         draw_label(win, f"Súper - Zásahy: {len(opponent.hits)}", (stats_panel.x + 25 + stats_spacing * 3, stats_panel.y + 20), size=24)
+
+def redrawWindow(win, player, opponent, hover_cell=None, game_time=0):
+    # Background, panels, titles and grids come from one cached layer
+    static = LAYERS.get("game", (width, height), (BattleshipsGame.BOARD_SIZE, current_theme()), draw_static_layer)
+    win.blit(static, (0, 0))
+    own_panel, opp_panel, stats_panel = board_panels()
+    
+    # Own board
+    draw_board(win, player, own_panel.x + 10, own_panel.y + 45, show_ships=True, grid=False)
+    
+    # Opponent board (grid is on the static layer), with hover highlight
+    offset_x = opp_panel.x + 10
+    offset_y = opp_panel.y + 45
+    for y in range(BattleshipsGame.BOARD_SIZE):
+        for x in range(BattleshipsGame.BOARD_SIZE):
+            draw_opponent_cell(win, player, offset_x, offset_y, x, y, hover_cell == (x, y))
+    
+    draw_turn_banner(win, player, opponent)
+    draw_stats(win, player, opponent, stats_panel)
     
     # Game status with glow
-    if player.game_over or (opponent and opponent.game_over):
-        # Determine winner and loser
-        if player.game_over:
-            winner_id = player.winner
-            loser_id = player.player_id
-        elif opponent and opponent.game_over:
-            winner_id = opponent.winner
-            loser_id = opponent.player_id
-        else:
-            winner_id = None
-            loser_id = None
-        
-        if winner_id is not None:
-            # Determine if current player won or lost
-            player_won = (winner_id == player.player_id)
-            
-            if player_won:
-                status_text = f"Vyhral si"
-                status_color = COLOR_HOVER
-                loser_text = f"Hráč {loser_id + 1} prehral"
-            else:
-                status_text = f"Druhý hráč vyhral!"
-                status_color = COLOR_HOVER
-                loser_text = f"Prehral si"
-            
-            # Center positions
-            center_y_winner = height // 2 - 30
-            center_y_loser = height // 2 + 30
-            
-            # Winner text with glow
-            for i in range(8):
-                glow_surf = FONT_VICTORY.render(status_text, True, tuple(min(255, c + (8-i) * 8) for c in status_color[:3]))
-                glow_rect = glow_surf.get_rect(center=(width // 2 + i, center_y_winner + i))
-                win.blit(glow_surf, glow_rect)
-            
-            # Winner shadow
-            shadow_surf = FONT_VICTORY.render(status_text, True, (0, 0, 0))
-            shadow_rect = shadow_surf.get_rect(center=(width // 2 + 4, center_y_winner + 4))
-            win.blit(shadow_surf, shadow_rect)
-            
-            # Winner text
-            text_surf = FONT_VICTORY.render(status_text, True, status_color)
-            text_rect = text_surf.get_rect(center=(width // 2, center_y_winner))
-            win.blit(text_surf, text_rect)
-            
-            # Particles around winner text
-            draw_victory_particles(win, width // 2, center_y_winner, game_time, status_color)
-            
-            # Loser text
-            loser_color = COLOR_HIT if player_won else COLOR_MISS
-            loser_surf = FONT_LARGE.render(loser_text, True, loser_color)
-            loser_rect = loser_surf.get_rect(center=(width // 2, center_y_loser))
-            shadow_loser = FONT_LARGE.render(loser_text, True, (0, 0, 0))
-            win.blit(shadow_loser, (loser_rect.x + 3, loser_rect.y + 3))
-            win.blit(loser_surf, loser_rect)
-            
-            # Particles around loser text (smaller)
-            for i in range(15):
-                angle = (game_time * 0.015 + i * (2 * math.pi / 15)) % (2 * math.pi)
-                distance = 60 + math.sin(game_time * 0.08 + i) * 15
-                x = width // 2 + math.cos(angle) * distance
-                y = center_y_loser + math.sin(angle) * distance
-                size = 2 + math.sin(game_time * 0.12 + i) * 1.5
-                brightness = int(120 + math.sin(game_time * 0.18 + i) * 80)
-                particle_color = tuple(min(255, c * brightness // 200) for c in loser_color[:3])
-                pygame.draw.circle(win, particle_color, (int(x), int(y)), int(size))
+    if is_game_over(player, opponent):
+        draw_game_over(win, player, opponent, game_time)
     
     pygame.display.update()
 
+def board_views(board_size):
+    """Viewports over the two board areas, for large-board matches"""
+    (own_x, own_y), (opp_x, opp_y) = board_offsets()
+    side = BattleshipsGame.BOARD_SIZE * CELL_SIZE
+    return Viewport((own_x, own_y, side, side), board_size), Viewport((opp_x, opp_y, side, side), board_size)
+
+def redraw_large(win, player, opponent, views, hover_cell=None, game_time=0):
+    """redrawWindow for large boards: each board area shows only the part its viewport is on"""
+    static = LAYERS.get("game", (width, height), (BattleshipsGame.BOARD_SIZE, current_theme()), draw_static_layer)
+    win.blit(static, (0, 0))
+    own_panel, opp_panel, stats_panel = board_panels()
+    own_view, opp_view = views
+    draw_board_view(win, own_view, player.own_bitboard, show_ships=True)
+    draw_board_view(win, opp_view, player.opponent_bitboard, show_ships=False, hover_cell=hover_cell)
+    draw_position(win, FONT, own_view, (own_panel.right - 12, own_panel.y + 18))
+    draw_position(win, FONT, opp_view, (opp_panel.right - 12, opp_panel.y + 18))
+    
+    draw_turn_banner(win, player, opponent)
+    draw_stats(win, player, opponent, stats_panel)
+    if is_game_over(player, opponent):
+        draw_game_over(win, player, opponent, game_time)
+    
+    pygame.display.update()
+
+def draw_game_over(win, player, opponent, game_time):
+    # Determine winner and loser
+    if player.game_over:
+        winner_id = player.winner
+        loser_id = player.player_id
+    elif opponent and opponent.game_over:
+        winner_id = opponent.winner
+        loser_id = opponent.player_id
+    else:
+        winner_id = None
+        loser_id = None
+    
+    if winner_id is not None:
+        # Determine if current player won or lost
+        player_won = (winner_id == player.player_id)
+        
+        if player_won:
+            status_text = f"Vyhral si"
+            status_color = COLOR_HOVER
+            loser_text = f"Hráč {loser_id + 1} prehral"
+        else:
+            status_text = f"Druhý hráč vyhral!"
+            status_color = COLOR_HOVER
+            loser_text = f"Prehral si"
+        
+        # Center positions
+        center_y_winner = height // 2 - 30
+        center_y_loser = height // 2 + 30
+        
+        # Winner text with glow
+        for i in range(8):
+            glow_surf = TEXT.render(FONT_VICTORY, status_text, tuple(min(255, c + (8-i) * 8) for c in status_color[:3]))
+            glow_rect = glow_surf.get_rect(center=(width // 2 + i, center_y_winner + i))
+            win.blit(glow_surf, glow_rect)
+        
+        # Winner shadow
+        shadow_surf = TEXT.render(FONT_VICTORY, status_text, (0, 0, 0))
+        shadow_rect = shadow_surf.get_rect(center=(width // 2 + 4, center_y_winner + 4))
+        win.blit(shadow_surf, shadow_rect)
+        
+        # Winner text
+        text_surf = TEXT.render(FONT_VICTORY, status_text, status_color)
+        text_rect = text_surf.get_rect(center=(width // 2, center_y_winner))
+        win.blit(text_surf, text_rect)
+        
+        # Particles around winner text
+        draw_victory_particles(win, width // 2, center_y_winner, game_time, status_color)
+        
+        # Loser text
+        loser_color = COLOR_HIT if player_won else COLOR_MISS
+        loser_surf = TEXT.render(FONT_LARGE, loser_text, loser_color)
+        loser_rect = loser_surf.get_rect(center=(width // 2, center_y_loser))
+        shadow_loser = TEXT.render(FONT_LARGE, loser_text, (0, 0, 0))
+        win.blit(shadow_loser, (loser_rect.x + 3, loser_rect.y + 3))
+        win.blit(loser_surf, loser_rect)
+        
+        # Particles around loser text (smaller)
+        particle_field("loser", loser_color).draw(win, game_time, (width // 2, center_y_loser))
+
+def changed_cells(mask):
+    """Yield (x, y) for every set bit of a board mask"""
+    while mask:
+        low = mask & -mask
+        index = low.bit_length() - 1
+        yield index % BattleshipsGame.BOARD_SIZE, index // BattleshipsGame.BOARD_SIZE
+        mask ^= low
+
+class DirtyRenderer:
+    """Redraws only the cells, turn banner and stats that changed since the last frame.
+    Falls back to redrawWindow for the first frame and while the game-over animation runs."""
+
+    GLOW = 3  # How far cell and panel effects reach past their rect
+
+    def __init__(self):
+        self.state = None
+        self.full = True
+
+    def invalidate(self):
+        """Force a full redraw on the next frame"""
+        self.full = True
+
+    def snapshot(self, player, opponent, hover_cell):
+        own = player.own_bitboard
+        seen = player.opponent_bitboard
+        if player.current_turn == player.player_id:
+            banner = "turn"
+        else:
+            banner = "wait"
+        stats = (len(player.shots_fired), len(player.hits),
+                 (len(opponent.shots_fired), len(opponent.hits)) if opponent else None)
+        return {
+            "own": (own.ships, own.hits, own.misses),
+            "seen": (seen.hits, seen.misses),
+            "hover": hover_cell,
+            "banner": banner,
+            "stats": stats,
+        }
+
+    def render(self, win, player, opponent, hover_cell=None, game_time=0):
+        state = self.snapshot(player, opponent, hover_cell)
+        if self.full or self.state is None or is_game_over(player, opponent):
+            redrawWindow(win, player, opponent, hover_cell, game_time)
+            self.state = state
+            self.full = is_game_over(player, opponent)
+            return
+
+        static = LAYERS.get("game", (width, height), (BattleshipsGame.BOARD_SIZE, current_theme()), draw_static_layer)
+        (own_x, own_y), (opp_x, opp_y) = board_offsets()
+        old = self.state
+        rects = []
+
+        own_changed = 0
+        for before, after in zip(old["own"], state["own"]):
+            own_changed |= before ^ after
+        for x, y in changed_cells(own_changed):
+            rects.append(self.redraw_cell(win, static, own_x, own_y, x, y,
+                                          lambda cx, cy: draw_cell(win, player, own_x, own_y, cx, cy)))
+
+        seen_changed = 0
+        for before, after in zip(old["seen"], state["seen"]):
+            seen_changed |= before ^ after
+        dirty = set(changed_cells(seen_changed))
+        if old["hover"] != hover_cell:
+            dirty.update(cell for cell in (old["hover"], hover_cell) if cell is not None)
+        for x, y in dirty:
+            rects.append(self.redraw_cell(win, static, opp_x, opp_y, x, y,
+                                          lambda cx, cy: draw_opponent_cell(win, player, opp_x, opp_y, cx, cy,
+                                                                            hover_cell == (cx, cy))))
+
+        if old["banner"] != state["banner"]:
+            rects.append(self.redraw_region(win, static, turn_panel_rect(),
+                                            lambda: draw_turn_banner(win, player, opponent)))
+        if old["stats"] != state["stats"]:
+            _, _, stats_panel = board_panels()
+            rects.append(self.redraw_region(win, static, stats_panel,
+                                            lambda: draw_stats(win, player, opponent, stats_panel)))
+
+        self.state = state
+        if rects:
+            pygame.display.update(rects)
+
+    def redraw_region(self, win, static, rect, draw):
+        """Restore rect (plus glow) from the static layer and draw on top of it, clipped to it"""
+        area = rect.inflate(self.GLOW * 2, self.GLOW * 2)
+        win.set_clip(area)
+        win.blit(static, area, area)
+        draw()
+        win.set_clip(None)
+        return area
+
+    def redraw_cell(self, win, static, offset_x, offset_y, x, y, paint):
+        cell = CELL_SIZE
+        rect = pygame.Rect(offset_x + x * cell, offset_y + y * cell, cell, cell)
+
+        def draw():
+            # Neighbours' glows reach into this cell's border, so repaint them too (the clip keeps them inside)
+            for ny in range(max(0, y - 1), min(BattleshipsGame.BOARD_SIZE, y + 2)):
+                for nx in range(max(0, x - 1), min(BattleshipsGame.BOARD_SIZE, x + 2)):
+                    paint(nx, ny)
+        return self.redraw_region(win, static, rect, draw)
+
+PARTICLE_FIELDS = {}
+
+def particle_field(kind, color):
+    """Particle effects are built once per kind and color and reused every frame"""
+    key = (kind, tuple(color[:3]))
+    field = PARTICLE_FIELDS.get(key)
+    if field is None:
+        field = victory_particles(color) if kind == "victory" else loser_particles(color)
+        PARTICLE_FIELDS[key] = field
+    return field
+
 def draw_victory_particles(surface, center_x, center_y, time, color):
     """Draw particles around victory text"""
-    particle_count = 30
-    for i in range(particle_count):
-        angle = (time * 0.02 + i * (2 * math.pi / particle_count)) % (2 * math.pi)
-        distance = 120 + math.sin(time * 0.05 + i) * 30
-        x = center_x + math.cos(angle) * distance
-        y = center_y + math.sin(angle) * distance
-        size = 4 + math.sin(time * 0.1 + i) * 2.5
-        brightness = int(150 + math.sin(time * 0.15 + i) * 105)
-        particle_color = tuple(min(255, c * brightness // 255) for c in color[:3])
-        pygame.draw.circle(surface, particle_color, (int(x), int(y)), int(size))
+    particle_field("victory", color).draw(surface, time, (center_x, center_y))
 
 def get_grid_pos(mouse_pos, offset_x, offset_y):
     """Convert mouse position to grid coordinates"""
     x, y = mouse_pos
-    grid_x = (x - offset_x) // BattleshipsGame.CELL_SIZE
-    grid_y = (y - offset_y) // BattleshipsGame.CELL_SIZE
+    grid_x = (x - offset_x) // CELL_SIZE
+    grid_y = (y - offset_y) // CELL_SIZE
     return grid_x, grid_y
 
 def main():
@@ -324,12 +453,19 @@ def main():
     pygame.display.set_caption("Battleships")
     
     run = True
-    n = Network()
+    if selected_mode == MODE_AI:
+        n = LocalGame()
+    else:
+        n = Network()
     p = n.getP()
-    clock = pygame.time.Clock()
+    p2 = None
+    scheduler = FrameScheduler("game")
+    n.on_update = scheduler.wake  # New state from the server draws a frame straight away
     init_font()
     hover_cell = None
     game_time = 0
+    renderer = DirtyRenderer() if DIRTY_RECTS else None
+    views = None  # Viewports, once we know this is a large-board match
     
     if p is None:
         print("\nFailed to connect to server.")
@@ -342,36 +478,56 @@ def main():
         return
     
     print(f"Selected game mode: {selected_mode}")
+    n.start()
     
     while run:
-        clock.tick(60)
-        game_time += 1
+        # Full rate only for the game-over effects, or while the computer opponent is about to move
+        ai_moving = selected_mode == MODE_AI and p.winner is None and p.current_turn != p.player_id
+        events, dt = scheduler.frame(animating=is_game_over(p, p2) or ai_moving)
+        game_time += dt * ANIMATION_RATE
         
-        # Send current state and receive updated self + opponent state
-        resp = n.send(p)
-        if resp:
-            p, p2 = resp
-        else:
-            p2 = None
+        # Latest state from the network worker; never waits on the server
+        p, p2 = n.latest()
+        if not n.connected or (not n.opponent_present and p.winner is None):
+            p2 = None  # Still shown once the match is decided, e.g. won because the opponent never came back
+        
+        if views is None and p.BOARD_SIZE != BattleshipsGame.BOARD_SIZE:
+            views = board_views(p.BOARD_SIZE)
         
         # Track hover cell on opponent grid
         mouse_pos = pygame.mouse.get_pos()
         panel_top = 75
         opponent_board_x = width // 2 + 20  # opp_panel.x + 10
         opponent_board_y = panel_top + 45  # opp_panel.y + 45
-        if (opponent_board_x <= mouse_pos[0] < opponent_board_x + BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE and
-            opponent_board_y <= mouse_pos[1] < opponent_board_y + BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE):
+        if (opponent_board_x <= mouse_pos[0] < opponent_board_x + BattleshipsGame.BOARD_SIZE * CELL_SIZE and
+            opponent_board_y <= mouse_pos[1] < opponent_board_y + BattleshipsGame.BOARD_SIZE * CELL_SIZE):
             grid_x, grid_y = get_grid_pos(mouse_pos, opponent_board_x, opponent_board_y)
             hover_cell = (grid_x, grid_y)
         else:
             hover_cell = None
+        if views:
+            hover_cell = views[1].cell_at(mouse_pos)
         
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 run = False
+                n.stop()
                 pygame.quit()
                 return
             
+            if event.type in EXPOSE_EVENTS and renderer:
+                renderer.invalidate()
+                continue
+            
+            if views:
+                if views[0].handle_event(event) or views[1].handle_event(event):
+                    continue
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    cell = views[1].cell_at(event.pos)
+                    if cell and p.current_turn == p.player_id and p.opponent_bitboard.cell(*cell) == 0:
+                        n.shoot(*cell)
+                continue
+            
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 mouse_pos = pygame.mouse.get_pos()
                 
@@ -379,17 +535,22 @@ def main():
                 panel_top = 75
                 opponent_board_x = width // 2 + 20  # opp_panel.x + 10
                 opponent_board_y = panel_top + 45  # opp_panel.y + 45
-                if (opponent_board_x <= mouse_pos[0] < opponent_board_x + BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE and
-                    opponent_board_y <= mouse_pos[1] < opponent_board_y + BattleshipsGame.BOARD_SIZE * BattleshipsGame.CELL_SIZE):
+                if (opponent_board_x <= mouse_pos[0] < opponent_board_x + BattleshipsGame.BOARD_SIZE * CELL_SIZE and
+                    opponent_board_y <= mouse_pos[1] < opponent_board_y + BattleshipsGame.BOARD_SIZE * CELL_SIZE):
                     
                     grid_x, grid_y = get_grid_pos(mouse_pos, opponent_board_x, opponent_board_y)
                     
                     if 0 <= grid_x < BattleshipsGame.BOARD_SIZE and 0 <= grid_y < BattleshipsGame.BOARD_SIZE:
-                        # Only allow shooting if it's this player's turn
-                        if p.current_turn == p.player_id:
-                            p.shoot(grid_x, grid_y)
+                        # Only allow shooting if it's this player's turn and the cell is still unknown
+                        if p.current_turn == p.player_id and p.opponent_board[grid_y][grid_x] == 0:
+                            n.shoot(grid_x, grid_y)
         
-        redrawWindow(win, p, p2, hover_cell, game_time)
+        if views:
+            redraw_large(win, p, p2, views, hover_cell, game_time)
+        elif renderer:
+            renderer.render(win, p, p2, hover_cell, game_time)
+        else:
+            redrawWindow(win, p, p2, hover_cell, game_time)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,248 @@
+"""Run the game server as several worker processes sharing one port, to use more than one core.
+
+    python cluster.py --workers 4
+
+Each worker is a full GameServer that owns the rooms it creates. They all accept on the game port
+with SO_REUSEPORT, so the kernel spreads new connections over them. A connection meant for another
+worker is handed over, file descriptor and all, through that worker's Unix socket:
+
+    a reconnect      the first byte of a session token is the index of the worker that issued it
+    a spectator      room ids are striped, room_id % workers is the owner
+    a new player     goes to a worker that has somebody waiting for an opponent, so two players
+                     who connect at the same time meet even if the kernel put them on different workers
+
+The supervisor restarts workers that die, collects their metrics and serves the combined stats.
+Needs SO_REUSEPORT and SCM_RIGHTS, so Linux or a BSD; elsewhere run server.py.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import shutil
+import socket
+import tempfile
+from array import array
+import protocol
+from engine import MAX_BOARD_SIZE
+from metrics import ClusterMetrics
+from server import GameServer, serve_stats, port as GAME_PORT, STATS_HOST, STATS_PORT, LOG_DIR
+
+REPORT_INTERVAL = 1  # Seconds between metrics reports from each worker
+CHECK_INTERVAL = 0.5  # Seconds between the supervisor's checks on its workers
+SUMMARY_INTERVAL = 30  # Seconds between [cluster] lines in the log; 0 turns them off
+MAX_HANDOFF = 256  # Largest opening frame passed along with a connection
+
+
+class Shard:
+    """One worker's place in the cluster: which sessions and rooms are its own, and how to pass a connection on"""
+
+    def __init__(self, index, workers, run_dir, waiting):
+        self.index = index
+        self.workers = workers
+        self.run_dir = run_dir
+        self.waiting = waiting  # Shared array, 1 where a worker has a player waiting for an opponent
+        self.server = None
+        self.sock = None
+        self.reporter = None  # Task sending this worker's metrics to the supervisor
+
+    def path(self, index):
+        return os.path.join(self.run_dir, f"worker-{index}.sock")
+
+    def listen(self, server):
+        """Start taking connections handed over by the other workers"""
+        self.server = server
+        path = self.path(self.index)
+        if os.path.exists(path):
+            os.unlink(path)  # Left behind by the worker this one replaces
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self.sock.fileno(), self.receive)
+
+    def set_waiting(self, waiting):
+        self.waiting[self.index] = int(waiting)
+
+    def owner(self, msg_type, body):
+        """Index of the worker that should serve a connection opening with this message"""
+        if msg_type == protocol.MSG_HELLO:
+            token, _ = body
+            if token != protocol.NO_TOKEN:
+                return token[0] % self.workers
+            # Lowest-indexed worker with someone waiting, so two workers that both have a waiting player
+            # send newcomers the same way instead of to each other; our own flag is read from the room
+            for index, waiting in enumerate(self.waiting):
+                if index == self.index:
+                    waiting = self.server.waiting_room is not None
+                if waiting:
+                    return index
+        elif msg_type == protocol.MSG_WATCH and body != protocol.FEATURED_ROOM:
+            return body % self.workers
+        return self.index
+
+    def hand_over(self, msg_type, body, writer):
+        """Pass the connection to the worker that owns it; False if that is us or the handoff failed"""
+        owner = self.owner(msg_type, body)
+        if owner == self.index:
+            return False
+        first = protocol.encode_hello(*body) if msg_type == protocol.MSG_HELLO else protocol.encode_watch(body)
+        try:
+            # socket.send_fds() ignores its address argument, hence sendmsg
+            fds = array("i", [writer.get_extra_info("socket").fileno()])
+            self.sock.sendmsg([first], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)], 0, self.path(owner))
+        except OSError as e:
+            # The owner is down or restarting: serve it here, which for a reconnect means "expired"
+            print(f"Handoff to worker {owner} failed: {e}")
+            return False
+        self.server.metrics.handoffs += 1
+        writer.close()  # The connection lives on in the owner's copy of the descriptor
+        return True
+
+    def receive(self):
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(self.sock, MAX_HANDOFF, 1)
+            except BlockingIOError:
+                return
+            if not fds:
+                continue
+            conn = socket.socket(fileno=fds[0])
+            try:
+                _, msg_type = protocol.parse_header(data[:protocol.FRAME_HEADER.size])
+                first = (msg_type, protocol.decode(msg_type, data[protocol.FRAME_HEADER.size:]))
+            except (protocol.ProtocolError, ValueError) as e:
+                print(f"Bad handoff: {e}")
+                conn.close()
+                continue
+            asyncio.ensure_future(self.adopt(conn, first))
+
+    async def adopt(self, conn, first):
+        reader, writer = await asyncio.open_connection(sock=conn)
+        await self.server.handle_client(reader, writer, first)
+
+
+async def report_metrics(server, index, reports):
+    while True:
+        stats = server.metrics.snapshot()
+        del stats["connections"]  # Per-connection detail stays on the worker
+        reports.put((index, os.getpid(), stats))
+        await asyncio.sleep(REPORT_INTERVAL)
+
+
+async def run_worker(index, workers, host, port, run_dir, waiting, reports, log_dir, board_size):
+    shard = Shard(index, workers, run_dir, waiting)
+    server = GameServer(log_dir, board_size, shard)
+    shard.listen(server)
+    shard.reporter = asyncio.create_task(report_metrics(server, index, reports))  # Keep a reference
+    await server.serve(host, port, None, 0, reuse_port=True)
+
+
+def worker_main(index, workers, host, port, run_dir, waiting, reports, log_dir, board_size):
+    try:
+        asyncio.run(run_worker(index, workers, host, port, run_dir, waiting, reports, log_dir, board_size))
+    except KeyboardInterrupt:
+        pass  # The supervisor is shutting everyone down
+
+
+class Supervisor:
+    """Starts the workers, restarts any that die and serves their combined metrics"""
+
+    def __init__(self, workers, host="", port=GAME_PORT, log_dir=None, board_size=None):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.log_dir = log_dir
+        self.board_size = board_size
+        self.run_dir = tempfile.mkdtemp(prefix="battleships-")  # Handoff sockets
+        self.waiting = multiprocessing.Array("b", workers, lock=False)
+        self.reports = multiprocessing.Queue()
+        self.processes = [None] * workers
+        self.metrics = ClusterMetrics(workers)
+
+    def start_worker(self, index):
+        self.waiting[index] = 0
+        process = multiprocessing.Process(
+            target=worker_main, name=f"worker-{index}", daemon=True,
+            args=(index, self.workers, self.host, self.port, self.run_dir, self.waiting, self.reports,
+                  self.log_dir, self.board_size))
+        process.start()
+        self.processes[index] = process
+        self.metrics.started_worker(index, process.pid)
+
+    def check_workers(self):
+        """Take in the workers' reports and restart any worker that has exited"""
+        while True:
+            try:
+                self.metrics.report(*self.reports.get_nowait())
+            except queue.Empty:
+                break
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                print(f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+                self.metrics.stopped_worker(index)
+                self.start_worker(index)
+
+    async def supervise(self, summary_interval):
+        next_summary = summary_interval
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            self.check_workers()
+            if summary_interval:
+                next_summary -= CHECK_INTERVAL
+                if next_summary <= 0:
+                    print(self.metrics.summary())
+                    next_summary = summary_interval
+
+    async def handle_stats(self, reader, writer):
+        await serve_stats(reader, writer, self.metrics)
+
+    async def run(self, stats_port=STATS_PORT, summary_interval=SUMMARY_INTERVAL):
+        for index in range(self.workers):
+            self.start_worker(index)
+        if stats_port is not None:
+            try:
+                await asyncio.start_server(self.handle_stats, STATS_HOST, stats_port)
+                print(f"Cluster stats on http://{STATS_HOST}:{stats_port}/ (JSON at /json)")
+            except OSError as e:
+                print(f"Stats endpoint disabled, bind failed: {e}")
+        await self.supervise(summary_interval)
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=2)
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Battleships server, one worker process per core")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=GAME_PORT)
+    parser.add_argument("--stats-port", type=int, default=STATS_PORT)
+    parser.add_argument("--board-size", type=int, default=None,
+                        help=f"large-board event mode, up to {MAX_BOARD_SIZE}x{MAX_BOARD_SIZE}")
+    args = parser.parse_args()
+    if not hasattr(socket, "SO_REUSEPORT") or not hasattr(socket, "recv_fds"):
+        parser.error("cluster mode needs SO_REUSEPORT and descriptor passing; use server.py on this platform")
+    if not 1 <= args.workers <= 255:
+        parser.error("--workers must be between 1 and 255")
+    if args.board_size is not None and not 5 <= args.board_size <= MAX_BOARD_SIZE:
+        parser.error(f"--board-size must be between 5 and {MAX_BOARD_SIZE}")
+
+    print(f"Server Started on port {args.port} with {args.workers} workers")
+    print("Waiting for connections...")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    supervisor = Supervisor(args.workers, "", args.port, LOG_DIR, args.board_size)
+    try:
+        asyncio.run(supervisor.run(args.stats_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
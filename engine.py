@@ -0,0 +1,178 @@
+import copy
+import random
+from collections import namedtuple
+from board import make_board
+from placement import random_fleet
+
+# What a shot did: hit or miss, the id (index in ships) of the ship it sank if any, and whether that ended the game
+ShotResult = namedtuple("ShotResult", "hit sunk game_over")
+
+MAX_BOARD_SIZE = 4096  # Large-board event matches; cell indices must fit the protocol's 32 bits
+
+
+def fleet_for(size):
+    """Ship lengths for a board: the standard fleet, once more for every 10 rows past the first 10"""
+    return BattleshipsGame.SHIPS * max(1, size // BattleshipsGame.BOARD_SIZE)
+
+
+class BattleshipsGame:
+    BOARD_SIZE = 10
+    
+    SHIPS = [5, 4, 3, 3, 2]  # Ship sizes
+    
+    def __init__(self, player_id, fleet=None, size=None):
+        self.player_id = player_id
+        if size is not None and size != self.BOARD_SIZE:
+            # Large-board mode: per-game size and fleet shadow the class defaults
+            if not 5 <= size <= MAX_BOARD_SIZE:
+                raise ValueError(f"Board size must be between 5 and {MAX_BOARD_SIZE}")
+            self.BOARD_SIZE = size
+            self.SHIPS = fleet_for(size)
+        self.own_bitboard = make_board(self.BOARD_SIZE)
+        self.opponent_bitboard = make_board(self.BOARD_SIZE)
+        self.ships = []  # List of ship positions [(x, y, length, horizontal), ...]
+        self.ship_at = {}  # Cell index (y * BOARD_SIZE + x) -> ship id
+        self.ship_health = []  # Cells left to hit per ship
+        self.ships_afloat = 0
+        self.shots_fired = []  # Append-only log of shots [(x, y), ...]
+        self.shot_cells = set()  # Same shots as cell indices, for duplicate checks
+        self.hits = []  # List of hits [(x, y), ...]
+        self.setup_complete = False
+        self.game_over = False
+        self.winner = None
+        self.current_turn = 0  # 0 = player 0, 1 = player 1
+        
+        # Auto-place ships for now (can be changed to manual placement)
+        if fleet is not None:
+            self.place_fleet(fleet)
+        elif not self.setup_complete:
+            self.auto_place_ships()
+
+    @property
+    def own_board(self):
+        """own_board[y][x] view: 0 water, 1 ship, 2 hit, -1 miss"""
+        return self.own_bitboard.rows()
+
+    @property
+    def opponent_board(self):
+        """opponent_board[y][x] view: 0 unknown, 2 hit, -1 miss"""
+        return self.opponent_bitboard.rows()
+    
+    def snapshot(self):
+        """Copy for another thread to read while this game moves on. Boards, shots and counters are
+        its own; the ship layout and cell index are shared, since only placing ships changes them"""
+        game = copy.copy(self)
+        game.own_bitboard = self.own_bitboard.snapshot()
+        game.opponent_bitboard = self.opponent_bitboard.snapshot()
+        game.ship_health = self.ship_health[:]
+        game.shots_fired = self.shots_fired[:]
+        game.shot_cells = set(self.shot_cells)
+        game.hits = self.hits[:]
+        return game
+    
+    def auto_place_ships(self, rng=random):
+        """Automatically place ships on the board"""
+        self.place_fleet(random_fleet(self.BOARD_SIZE, self.SHIPS, rng))
+
+    def place_fleet(self, fleet):
+        """Replace the fleet with placements from placement.random_fleet / random_fleets"""
+        self.ships = []
+        self.ship_at = {}
+        self.ship_health = []
+        self.ships_afloat = 0
+        self.own_bitboard.clear_ships()
+        for option in fleet:
+            self.add_ship(option.x, option.y, option.length, option.horizontal, option.mask)
+        self.setup_complete = True
+
+    def add_ship(self, x, y, length, horizontal, mask):
+        self.ships.append((x, y, length, horizontal))
+        self.own_bitboard.add_ship(mask)
+        self.index_ship(len(self.ships) - 1)
+
+    def index_ship(self, ship_id):
+        """Point every cell of a ship at its id and count the cells not yet hit"""
+        x, y, length, horizontal = self.ships[ship_id]
+        step = 1 if horizontal else self.BOARD_SIZE
+        start = y * self.BOARD_SIZE + x
+        health = length
+        for cell in range(start, start + step * length, step):
+            self.ship_at[cell] = ship_id
+            if self.own_bitboard.hit_at(cell):
+                health -= 1
+        self.ship_health.append(health)
+        if health:
+            self.ships_afloat += 1
+
+    def index_ships(self):
+        """Rebuild the ship index, e.g. after the game was loaded from the wire"""
+        self.ship_at = {}
+        self.ship_health = []
+        self.ships_afloat = 0
+        for ship_id in range(len(self.ships)):
+            self.index_ship(ship_id)
+    
+    def place_ship(self, x, y, length, horizontal):
+        """Manually place a ship"""
+        if not self.own_bitboard.fits(x, y, length, horizontal):
+            return False
+        
+        # Check overlap
+        mask = self.own_bitboard.ship_mask(x, y, length, horizontal)
+        if self.own_bitboard.overlaps(mask):
+            return False
+        
+        self.add_ship(x, y, length, horizontal, mask)
+        return True
+    
+    def shoot(self, x, y):
+        """Shoot at opponent's board"""
+        if x < 0 or x >= self.BOARD_SIZE or y < 0 or y >= self.BOARD_SIZE:
+            return False
+        cell = y * self.BOARD_SIZE + x
+        if cell in self.shot_cells:
+            return False  # Already shot here
+        
+        self.shot_cells.add(cell)
+        self.shots_fired.append((x, y))
+        return True
+
+    def index_shots(self):
+        """Rebuild shot_cells from shots_fired"""
+        self.shot_cells = {y * self.BOARD_SIZE + x for x, y in self.shots_fired}
+    
+    def receive_shot(self, x, y):
+        """Receive a shot from opponent"""
+        return self.resolve_shot(x, y).hit
+
+    def resolve_shot(self, x, y):
+        """Apply a shot from the opponent and report hit, sunk ship and game over in one lookup"""
+        board = self.own_bitboard
+        if not board.in_bounds(x, y):
+            return ShotResult(False, None, self.game_over)
+        
+        # Check if already shot
+        bit = board.bit(x, y)
+        if board.is_shot(bit):
+            return ShotResult(board.is_hit(bit), None, self.game_over)
+        
+        ship_id = self.ship_at.get(y * self.BOARD_SIZE + x)
+        hit = ship_id is not None
+        board.mark(bit, hit)
+        if not hit:
+            return ShotResult(False, None, self.game_over)
+
+        self.hits.append((x, y))
+        self.ship_health[ship_id] -= 1
+        if self.ship_health[ship_id]:
+            return ShotResult(True, None, self.game_over)
+
+        self.ships_afloat -= 1
+        if not self.ships_afloat:
+            self.game_over = True
+        return ShotResult(True, ship_id, self.game_over)
+    
+    def update_opponent_board(self, x, y, hit):
+        """Update opponent board after shooting"""
+        board = self.opponent_bitboard
+        board.mark(board.bit(x, y), hit)
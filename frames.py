@@ -0,0 +1,79 @@
+import time
+import pygame
+
+# Frame pacing for the menu and the game: full rate only while something on screen moves or the
+# user is doing something; otherwise the loop sleeps in pygame.event.wait and wakes for input,
+# for wake() (the network thread calls it when new state arrives) or when the idle timeout runs out
+
+WAKE_EVENT = pygame.event.custom_type()
+ANIMATION_RATE = 60  # Animation steps per second; effects were tuned for one step per frame at 60 FPS
+ACTIVE_GRACE = 0.5  # Seconds to stay at full rate after the last input, so hovers and clicks feel instant
+IDLE_TIMEOUT = 1.0  # Longest sleep while idle
+REPORT_INTERVAL = 30  # Seconds between [frames] lines in the log; 0 turns them off
+
+
+class FrameScheduler:
+    """Decides when the next frame is drawn, and keeps count of how much of the time was spent asleep"""
+
+    def __init__(self, name, fps=60, idle_fps=0, report_interval=REPORT_INTERVAL):
+        self.name = name
+        self.fps = fps  # 0 runs uncapped and never idles, for profiling
+        self.idle_fps = idle_fps  # Rate for ambient animation while idle; 0 draws only when woken
+        self.report_interval = report_interval
+        self.clock = pygame.time.Clock()
+        self.active_until = 0.0
+        now = time.perf_counter()
+        self.last_frame = now
+        self.report_started = now
+        self.frames = 0
+        self.total_frames = 0
+        self.idle = 0.0  # Seconds spent waiting since the last report
+
+    def wake(self):
+        """Draw a frame as soon as possible; safe to call from any thread"""
+        pygame.event.post(pygame.event.Event(WAKE_EVENT))
+
+    def frame(self, animating=False):
+        """Wait until the next frame is due; return (events, seconds since the previous frame)"""
+        started = time.perf_counter()
+        if animating or not self.fps or started < self.active_until:
+            self.clock.tick(self.fps)
+            events = pygame.event.get()
+        else:
+            timeout = 1 / self.idle_fps if self.idle_fps else IDLE_TIMEOUT
+            remaining = timeout - (started - self.last_frame)
+            events = []
+            if remaining > 0:
+                event = pygame.event.wait(max(1, int(remaining * 1000)))
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+            events.extend(pygame.event.get())
+            self.clock.tick()  # Keep the clock's idea of the last frame current for when we speed up again
+
+        now = time.perf_counter()
+        self.idle += now - started
+        if any(event.type != WAKE_EVENT for event in events):
+            self.active_until = now + ACTIVE_GRACE
+        events = [event for event in events if event.type != WAKE_EVENT]
+        dt = now - self.last_frame
+        self.last_frame = now
+        self.frames += 1
+        self.total_frames += 1
+        if self.report_interval and now - self.report_started >= self.report_interval:
+            print(self.report())
+        return events, dt
+
+    def stats(self):
+        """(frames per second, fraction of the time spent waiting) since the last report"""
+        elapsed = time.perf_counter() - self.report_started
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return self.frames / elapsed, min(1.0, self.idle / elapsed)
+
+    def report(self):
+        """One log line with the achieved frame rate and idle ratio; starts a new measurement"""
+        fps, idle = self.stats()
+        self.report_started = time.perf_counter()
+        self.frames = 0
+        self.idle = 0.0
+        return f"[frames] {self.name}: {fps:.1f} fps, {idle:.0%} idle"
@@ -0,0 +1,246 @@
+"""Append-only binary log of one match, and a reader that replays it lazily.
+
+A log is a file header followed by records, each a type byte, a payload length and the payload:
+
+    keyframe   seq plus both full games, in the same encoding as a snapshot frame
+    events     a batch of events, packed exactly as on the wire
+    index      (seq, offset) of every keyframe, written once when the log is closed
+
+The first record is the keyframe at seq 0, which holds both fleets. A new keyframe is written
+only once the events since the last one take more bytes than that keyframe did, so keyframes
+never cost more than the events themselves, even as a large board fills up. A fixed-size footer points
+at the index, so a closed log opens without a scan; a log cut short by a crash is scanned
+record by record instead.
+
+    python gamelog.py logs/room-0-20240101-120000.bslog --at 40
+"""
+import argparse
+import os
+import struct
+import time
+from bisect import bisect_right
+import protocol
+from network import apply_event
+
+MAGIC = b"BSLG"
+LOG_VERSION = 1
+FILE_HEADER = struct.Struct("!4sB")
+RECORD_HEADER = struct.Struct("!BI")
+INDEX_ENTRY = struct.Struct("!IQ")  # seq, file offset of the keyframe record
+FOOTER = struct.Struct("!Q4s")  # file offset of the index record, magic
+
+REC_KEYFRAME = 1
+REC_EVENTS = 2
+REC_INDEX = 3
+
+KEYFRAME_EVERY = 32  # Fewest events between keyframes; more once keyframes outgrow them, see update
+BUFFER_SIZE = 1 << 16  # A whole match usually fits, so it reaches the disk in one write
+
+
+def log_path(log_dir, room_id):
+    return os.path.join(log_dir, f"room-{room_id}-{time.strftime('%Y%m%d-%H%M%S')}.bslog")
+
+
+def create_log(path):
+    """Open a new log file, never an existing one: a taken name, e.g. after a quick restart,
+    gets -1, -2, ... added. Returns (file, path actually used)"""
+    base, ext = os.path.splitext(path)
+    attempt = 0
+    while True:
+        try:
+            return open(path, "xb", buffering=BUFFER_SIZE), path
+        except FileExistsError:
+            attempt += 1
+            path = f"{base}-{attempt}{ext}"
+
+
+class GameLogWriter:
+    """Records a Room's event log as it grows; attach it as room.recorder"""
+
+    def __init__(self, path, room):
+        self.file, self.path = create_log(path)
+        self.offset = 0
+        self.seq = room.seq  # Last event written
+        self.keyframes = []  # (seq, offset)
+        self.last_keyframe = None
+        self.keyframe_size = 0  # Bytes of the last keyframe record
+        self.events_size = 0  # Bytes of event records written since then
+        self.write(FILE_HEADER.pack(MAGIC, LOG_VERSION))
+        self.keyframe(room)
+
+    def write(self, data):
+        self.file.write(data)
+        self.offset += len(data)
+
+    def record(self, rec_type, payload):
+        offset = self.offset
+        self.write(RECORD_HEADER.pack(rec_type, len(payload)) + payload)
+        return offset
+
+    def keyframe(self, room):
+        payload = protocol.SEQ.pack(room.seq) + protocol.pack_game(room.players[0]) + protocol.pack_game(room.players[1])
+        self.keyframes.append((room.seq, self.record(REC_KEYFRAME, payload)))
+        self.last_keyframe = room.seq
+        self.keyframe_size = len(payload)
+        self.events_size = 0
+
+    def update(self, room):
+        """Append the events room has produced since the last call; cheap enough to run after every shot"""
+        events = room.events_since(self.seq)
+        if not events:
+            return
+        payload = b"".join([protocol.EVENT.pack(*event) for event in events])
+        self.record(REC_EVENTS, payload)
+        self.seq = room.seq
+        self.events_size += len(payload)
+        # Waiting until the events outweigh the last keyframe keeps the log linear in the match
+        # length; a keyframe every N events would make it quadratic on a large board
+        if self.seq - self.last_keyframe >= KEYFRAME_EVERY and self.events_size >= self.keyframe_size:
+            self.keyframe(room)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index = b"".join([INDEX_ENTRY.pack(seq, offset) for seq, offset in self.keyframes])
+        index_offset = self.record(REC_INDEX, index)
+        self.write(FOOTER.pack(index_offset, MAGIC))
+        self.file.close()
+
+
+class GameLog:
+    """Read side of a log: lazy event stream, keyframe index and state at any seq"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        magic, version = FILE_HEADER.unpack(self.file.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a game log")
+        if version != LOG_VERSION:
+            raise ValueError(f"Unsupported game log version {version}")
+        self.keyframes = self.read_index() or self.scan_index()
+        self.seqs = [seq for seq, _ in self.keyframes]
+        if not self.keyframes:
+            raise ValueError(f"{path} has no keyframes")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_index(self):
+        """Keyframe index from the footer of a closed log, or None"""
+        size = os.fstat(self.file.fileno()).st_size
+        if size < FILE_HEADER.size + FOOTER.size:
+            return None
+        self.file.seek(size - FOOTER.size)
+        index_offset, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != MAGIC or index_offset >= size:
+            return None
+        rec_type, payload = self.read_record(index_offset)
+        if rec_type != REC_INDEX:
+            return None
+        return list(INDEX_ENTRY.iter_unpack(payload))
+
+    def scan_index(self):
+        """Rebuild the index by hopping from record header to record header"""
+        keyframes = []
+        offset = FILE_HEADER.size
+        self.file.seek(offset)
+        while True:
+            header = self.file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            rec_type, length = RECORD_HEADER.unpack(header)
+            if rec_type == REC_KEYFRAME:
+                seq_bytes = self.file.read(protocol.SEQ.size)
+                if len(seq_bytes) < protocol.SEQ.size:
+                    break
+                keyframes.append((protocol.SEQ.unpack(seq_bytes)[0], offset))
+            offset += RECORD_HEADER.size + length
+            self.file.seek(offset)
+        return keyframes
+
+    def read_record(self, offset):
+        self.file.seek(offset)
+        header = self.file.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return None, None
+        rec_type, length = RECORD_HEADER.unpack(header)
+        payload = self.file.read(length)
+        if len(payload) < length:
+            return None, None  # Torn write at the end of a crashed log
+        return rec_type, payload
+
+    def records(self, offset=FILE_HEADER.size):
+        """Yield (type, payload) from offset to the end, reading one record at a time"""
+        while True:
+            rec_type, payload = self.read_record(offset)
+            if rec_type is None or rec_type == REC_INDEX:
+                return
+            offset += RECORD_HEADER.size + len(payload)
+            yield rec_type, payload
+
+    def events(self, after=0):
+        """Lazily yield every event with seq > after"""
+        _, offset = self.keyframes[max(0, bisect_right(self.seqs, after) - 1)]
+        for rec_type, payload in self.records(offset):
+            if rec_type != REC_EVENTS:
+                continue
+            for fields in protocol.EVENT.iter_unpack(payload):
+                if fields[0] > after:
+                    yield protocol.Event._make(fields)
+
+    def state_at(self, seq):
+        """(player 0 game, player 1 game) right after event seq: nearest keyframe by bisection, then replay"""
+        index = max(0, bisect_right(self.seqs, seq) - 1)
+        _, offset = self.keyframes[index]
+        rec_type, payload = self.read_record(offset)
+        at, first, second = protocol.decode(protocol.MSG_SNAPSHOT, payload)
+        for rec_type, payload in self.records(offset + RECORD_HEADER.size + len(payload)):
+            if rec_type != REC_EVENTS:
+                continue
+            for fields in protocol.EVENT.iter_unpack(payload):
+                event = protocol.Event._make(fields)
+                if event.seq <= at:
+                    continue
+                if event.seq > seq:
+                    return first, second
+                apply_event(first, second, event)
+        return first, second
+
+    @property
+    def last_seq(self):
+        last = self.seqs[-1]
+        for event in self.events(last):
+            last = event.seq
+        return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a Battleships game log")
+    parser.add_argument("path")
+    parser.add_argument("--at", type=int, default=None, help="print both boards after this event")
+    args = parser.parse_args()
+
+    with GameLog(args.path) as log:
+        print(f"{args.path}: {len(log.keyframes)} keyframes, last seq {log.last_seq}")
+        if args.at is None:
+            names = {protocol.EV_SHOT: "shot", protocol.EV_TURN: "turn",
+                     protocol.EV_GAME_OVER: "game over", protocol.EV_SUNK: "sunk", protocol.EV_PRESENCE: "presence"}
+            for event in log.events():
+                print(f"{event.seq:>5} player {event.player} {names.get(event.kind, event.kind):<9} "
+                      f"({event.x}, {event.y}) {event.result}")
+            return
+        for game in log.state_at(args.at):
+            print(f"Player {game.player_id} (turn {game.current_turn}, winner {game.winner})")
+            for row in game.own_board:
+                print(" ".join({0: ".", 1: "#", 2: "X", -1: "o"}[cell] for cell in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""Load-test the game server with headless bots that speak the client protocol over loopback.
+
+    python loadtest.py --clients 200 --rate 30 --duration 20
+    python loadtest.py --clients 1000 --processes 4 --port 5555 --external
+    python loadtest.py --clients 20 --spectators 500
+    python loadtest.py --clients 2000 --processes 4 --workers 4   # against a cluster.py server
+
+Each bot connects, says hello and reads its snapshot. Like Network, it then only listens for what the
+server pushes, and fires a shot --rate times a second while it is its turn. Finished games are
+followed by a reconnect and a new game.
+Spectators watch the featured match and move on to the next one when it ends.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from collections import Counter
+import protocol
+from cluster import Supervisor
+from server import GameServer
+
+
+class LoadStats:
+    """What one bot process saw; merged across processes at the end"""
+
+    def __init__(self):
+        self.rtts = []  # Seconds per request, send to reply
+        self.games = 0
+        self.shots = 0
+        self.connects = 0
+        self.watched = 0  # Matches the spectators followed
+        self.spectator_frames = 0
+        self.spectator_bytes = 0
+        self.skips = 0  # Snapshots after the first: the server skipped a lagging spectator ahead
+        self.errors = Counter()
+
+    def merge(self, other):
+        self.rtts.extend(other.rtts)
+        self.games += other.games
+        self.shots += other.shots
+        self.connects += other.connects
+        self.watched += other.watched
+        self.spectator_frames += other.spectator_frames
+        self.spectator_bytes += other.spectator_bytes
+        self.skips += other.skips
+        self.errors.update(other.errors)
+
+
+def percentile(values, q):
+    """q-th percentile (0..100) of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def play_game(host, port, interval, deadline, stats, rng):
+    """Connect, play one game to the end (or until the deadline) and disconnect"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    stats.connects += 1
+    try:
+        writer.write(protocol.encode_hello())
+        msg_type, _ = await protocol.read_message(reader)
+        if msg_type != protocol.MSG_SESSION:
+            raise protocol.ProtocolError(f"Expected a session, got message type {msg_type}")
+        msg_type, body = await protocol.read_message(reader)
+        if msg_type != protocol.MSG_SNAPSHOT:
+            raise protocol.ProtocolError(f"Expected a snapshot, got message type {msg_type}")
+        seq, own, _ = body
+        me = own.player_id
+        turn = own.current_turn
+        opponent_here = me == 1  # Player 1 joins a room player 0 is already waiting in
+        cells = [(x, y) for y in range(own.BOARD_SIZE) for x in range(own.BOARD_SIZE)]
+        rng.shuffle(cells)
+
+        # The server pushes the opponent's moves; a bot only sends when it is its turn, after thinking for interval
+        started = None
+        pinged = False  # A heartbeat is out; its reply is not the answer to a shot
+        next_shot = last_sent = time.monotonic()
+        next_shot += interval
+        while time.monotonic() < deadline:
+            now = time.monotonic()
+            waiting = turn == me and opponent_here and cells and started is None
+            if waiting and not pinged and now >= next_shot:
+                writer.write(protocol.encode_shoot(*cells.pop()))
+                stats.shots += 1
+                started = time.perf_counter()
+                last_sent = now
+                waiting = False
+            elif started is None and not pinged and now - last_sent >= protocol.HEARTBEAT_INTERVAL:
+                writer.write(protocol.encode_sync(seq))  # Heartbeat while thinking or waiting, like the real client
+                pinged = True
+                last_sent = now
+            wake = min(deadline, last_sent + protocol.HEARTBEAT_INTERVAL)
+            if waiting and not pinged:
+                wake = min(wake, next_shot)
+            try:
+                msg_type, events = await asyncio.wait_for(protocol.read_message(reader), max(0.0, wake - now))
+            except asyncio.TimeoutError:
+                continue
+            pinged = False  # Whatever came first, the connection is alive and it is our move again
+            if started is not None:
+                stats.rtts.append(time.perf_counter() - started)  # The reply to our shot
+                started = None
+                next_shot = time.monotonic() + interval
+            if msg_type != protocol.MSG_EVENTS:
+                raise protocol.ProtocolError(f"Expected events, got message type {msg_type}")
+
+            for event in events:
+                if event.seq <= seq:
+                    continue
+                if event.seq != seq + 1:
+                    stats.errors["seq_gap"] += 1
+                seq = event.seq
+                if event.kind == protocol.EV_TURN:
+                    turn = event.player
+                elif event.kind == protocol.EV_PRESENCE and event.player != me:
+                    opponent_here = bool(event.result)
+                elif event.kind == protocol.EV_GAME_OVER:
+                    if me == 0:
+                        stats.games += 1  # Both bots see it; count each game once
+                    return
+    finally:
+        writer.close()
+
+
+async def bot(host, port, interval, deadline, stats, rng):
+    """Play games back to back until the deadline"""
+    await asyncio.sleep(rng.random() * interval)  # Spread the polls over the interval
+    while time.monotonic() < deadline:
+        try:
+            await play_game(host, port, interval, deadline, stats, rng)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, protocol.ProtocolError) as e:
+            stats.errors[type(e).__name__] += 1
+            await asyncio.sleep(interval)
+
+
+async def watch_game(host, port, deadline, stats):
+    """Watch the featured match until it ends (the server closes the stream) or the deadline"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(protocol.encode_watch())
+        seq = None
+        while time.monotonic() < deadline:
+            try:
+                length, msg_type = protocol.parse_header(
+                    await asyncio.wait_for(reader.readexactly(protocol.FRAME_HEADER.size), deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                return
+            body = protocol.decode(msg_type, await reader.readexactly(length))
+            stats.spectator_frames += 1
+            stats.spectator_bytes += protocol.FRAME_HEADER.size + length
+            if msg_type == protocol.MSG_SNAPSHOT:
+                if seq is None:
+                    stats.watched += 1
+                else:
+                    stats.skips += 1
+                seq = body[0]
+                continue
+            for event in body:
+                if event.seq <= seq:
+                    continue
+                if event.seq != seq + 1:
+                    stats.errors["spectator_seq_gap"] += 1
+                seq = event.seq
+    finally:
+        writer.close()
+
+
+async def spectator(host, port, deadline, stats):
+    """Watch matches back to back until the deadline"""
+    while time.monotonic() < deadline:
+        try:
+            await watch_game(host, port, deadline, stats)
+        except asyncio.IncompleteReadError:
+            pass  # Match over, or no match to watch yet
+        except (ConnectionError, OSError, protocol.ProtocolError) as e:
+            stats.errors[type(e).__name__] += 1
+        await asyncio.sleep(0.1)
+
+
+async def run_bots(host, port, clients, rate, duration, seed, spectators=0):
+    stats = LoadStats()
+    deadline = time.monotonic() + duration
+    rng = random.Random(seed)
+    await asyncio.gather(*[bot(host, port, 1 / rate, deadline, stats, random.Random(rng.random()))
+                           for _ in range(clients)],
+                         *[spectator(host, port, deadline, stats) for _ in range(spectators)])
+    return stats
+
+
+def bot_process(host, port, clients, rate, duration, seed, results, spectators=0):
+    results.put(asyncio.run(run_bots(host, port, clients, rate, duration, seed, spectators)))
+
+
+def server_process(port, workers=0):
+    sys.stdout = open(os.devnull, "w")  # One line per connection would drown the report
+    if not workers:
+        asyncio.run(GameServer().serve("127.0.0.1", port, None, 0))
+        return
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # So the supervisor takes its workers down too
+    supervisor = Supervisor(workers, "127.0.0.1", port)
+    try:
+        asyncio.run(supervisor.run(None, 0))
+    finally:
+        supervisor.stop()
+
+
+def wait_for_port(port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit(f"Server did not come up on port {port}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_test(clients, rate, duration, processes=1, port=None, seed=None, spectators=0, workers=0):
+    """Run the bots (and a local server, or a cluster of workers, unless port is given) and return the merged LoadStats"""
+    server = None
+    if port is None:
+        port = free_port()
+        # A supervisor has worker processes of its own, which daemon processes may not
+        server = multiprocessing.Process(target=server_process, args=(port, workers), daemon=not workers)
+        server.start()
+        wait_for_port(port)
+    try:
+        results = multiprocessing.Queue()
+        shares = [clients // processes + (i < clients % processes) for i in range(processes)]
+        watchers = [spectators // processes + (i < spectators % processes) for i in range(processes)]
+        workers = [multiprocessing.Process(target=bot_process,
+                                           args=("127.0.0.1", port, share, rate, duration,
+                                                 None if seed is None else seed + i, results, watchers[i]))
+                   for i, share in enumerate(shares) if share or watchers[i]]
+        for worker in workers:
+            worker.start()
+        stats = LoadStats()
+        for _ in workers:
+            stats.merge(results.get())
+        for worker in workers:
+            worker.join()
+        return stats
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Battleships server load test over loopback")
+    parser.add_argument("--clients", type=int, default=100, help="simulated clients (two per match)")
+    parser.add_argument("--rate", type=float, default=30, help="shots per second per client while it is its turn")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--processes", type=int, default=1, help="processes to spread the bots over")
+    parser.add_argument("--port", type=int, default=None, help="port of the server (default: start one)")
+    parser.add_argument("--external", action="store_true", help="use the server already running on --port")
+    parser.add_argument("--spectators", type=int, default=0, help="viewers of the featured match")
+    parser.add_argument("--workers", type=int, default=0, help="run the local server as a cluster of this many workers")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.external and args.port is None:
+        parser.error("--external needs --port")
+
+    port = args.port if args.external else None
+    print(f"{args.clients} clients at {args.rate:g} Hz for {args.duration:g}s "
+          f"({args.processes} bot process{'es' if args.processes != 1 else ''})...")
+    stats = load_test(args.clients, args.rate, args.duration, args.processes, port, args.seed, args.spectators,
+                      args.workers)
+
+    rtts = sorted(stats.rtts)
+    requests = len(rtts)
+    errors = sum(stats.errors.values())
+    print(f"Games finished: {stats.games} ({stats.games / args.duration:.1f} games/s)")
+    print(f"Requests: {requests} ({requests / args.duration:.0f}/s), shots {stats.shots}, connects {stats.connects}")
+    print(f"Round trip: p50 {percentile(rtts, 50) * 1e3:.2f} ms, p99 {percentile(rtts, 99) * 1e3:.2f} ms, "
+          f"max {(rtts[-1] if rtts else 0) * 1e3:.2f} ms")
+    if args.spectators:
+        print(f"Spectators: {stats.watched} matches watched, {stats.spectator_frames} frames / "
+              f"{stats.spectator_bytes} B received, {stats.skips} skipped ahead")
+    print(f"Errors: {errors} ({errors / max(1, requests + errors):.2%})"
+          + "".join(f", {name} {count}" for name, count in stats.errors.most_common()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import pygame
 import math
+from render_cache import LAYERS, TEXT, draw_gradient
+from particles import menu_particles
+from frames import FrameScheduler, ANIMATION_RATE
 
 # Colors
 COLOR_BG = (8, 12, 24)           # Darker navy background
@@ -15,22 +18,31 @@ COLOR_BUTTON_HOVER = (99, 102, 241)  # Indigo
 COLOR_SELECTED = (94, 234, 212)   # Cyan for selected mode
 COLOR_ACCENT = (239, 68, 68)     # Red accent
 
+# Game modes returned by Menu.run
+MODE_ONLINE = 0  # Against another player through the server
+MODE_AI = 1      # Single player against the computer
+
 class Menu:
+    FPS = 60  # Frame cap; 0 runs uncapped
+    IDLE_FPS = 15  # The background particles keep drifting at this rate while nobody touches anything
+
     def __init__(self, width=900, height=520):
         self.width = width
         self.height = height
         self.win = pygame.display.set_mode((width, height))
         pygame.display.set_caption("Battleships - Menu")
         
-        self.selected_mode = 0  # 0 or 1 for the two game modes
+        self.selected_mode = MODE_ONLINE
         self.font_title = None
         self.font_large = None
         self.font_normal = None
         self.font_small = None
         self.init_fonts()
         
-        self.time = 0  # For animations
+        self.time = 0  # For animations, in ANIMATION_RATE steps per second
+        self.scheduler = None
         self.pulse_offset = 0
+        self.particles = menu_particles(width, height, COLOR_BUTTON)
     
     def init_fonts(self):
         pygame.font.init()
@@ -41,12 +53,9 @@ class Menu:
     
     def draw_gradient_background(self, surface):
         """Draw gradient background"""
-        for y in range(self.height):
-            ratio = y / self.height
-            r = int(COLOR_BG[0] * (1 - ratio) + COLOR_BG_GRADIENT[0] * ratio)
-            g = int(COLOR_BG[1] * (1 - ratio) + COLOR_BG_GRADIENT[1] * ratio)
-            b = int(COLOR_BG[2] * (1 - ratio) + COLOR_BG_GRADIENT[2] * ratio)
-            pygame.draw.line(surface, (r, g, b), (0, y), (self.width, y))
+        background = LAYERS.get("background", (self.width, self.height), (COLOR_BG, COLOR_BG_GRADIENT),
+                                lambda layer: draw_gradient(layer, COLOR_BG, COLOR_BG_GRADIENT))
+        surface.blit(background, (0, 0))
     
     def draw_glow_effect(self, surface, rect, color, intensity=5):
         """Draw glow effect around rectangle"""
@@ -69,12 +78,7 @@ class Menu:
         else:
             font = self.font_normal
         
-        if shadow:
-            shadow_surf = font.render(text, True, (0, 0, 0))
-            surface.blit(shadow_surf, (pos[0] + 2, pos[1] + 2))
-        
-        text_surf = font.render(text, True, color)
-        surface.blit(text_surf, pos)
+        surface.blit(TEXT.label(font, text, color, shadow=2 if shadow else 0), pos)
     
     def draw_button(self, surface, text, rect, hover=False, pulse=False):
         # Glow effect on hover
@@ -110,9 +114,9 @@ class Menu:
         pygame.draw.rect(surface, border_color, rect, width=3, border_radius=12)
         
         # Text with shadow
-        text_surf = self.font_normal.render(text, True, COLOR_TEXT_BRIGHT)
+        text_surf = TEXT.render(self.font_normal, text, COLOR_TEXT_BRIGHT)
         text_rect = text_surf.get_rect(center=rect.center)
-        shadow_surf = self.font_normal.render(text, True, (0, 0, 0))
+        shadow_surf = TEXT.render(self.font_normal, text, (0, 0, 0))
         surface.blit(shadow_surf, (text_rect.x + 2, text_rect.y + 2))
         surface.blit(text_surf, text_rect)
     
@@ -161,46 +165,15 @@ class Menu:
             pygame.draw.circle(surface, COLOR_TEXT_BRIGHT, indicator.center, 4)
         
         # Text
-        text_surf = self.font_normal.render(text, True, COLOR_TEXT_BRIGHT if selected else COLOR_TEXT)
+        text_surf = TEXT.render(self.font_normal, text, COLOR_TEXT_BRIGHT if selected else COLOR_TEXT)
         text_rect = text_surf.get_rect(center=rect.center)
-        shadow_surf = self.font_normal.render(text, True, (0, 0, 0))
+        shadow_surf = TEXT.render(self.font_normal, text, (0, 0, 0))
         surface.blit(shadow_surf, (text_rect.x + 1, text_rect.y + 1))
         surface.blit(text_surf, text_rect)
     
     def draw_particles(self, surface):
         """Draw animated particles in background with various directions"""
-        particle_count = 50
-        for i in range(particle_count):
-            # Different movement patterns for variety
-            pattern = i % 4
-            
-            if pattern == 0:  # Horizontal moving
-                x = (self.time * 4 + i * 20) % (self.width + 100) - 50
-                y = self.height // 2 + math.sin(self.time * 0.05 + i * 0.2) * 100
-            elif pattern == 1:  # Vertical moving
-                x = self.width // 2 + math.cos(self.time * 0.04 + i * 0.3) * 200
-                y = (self.time * 3 + i * 15) % (self.height + 80) - 40
-            elif pattern == 2:  # Diagonal
-                angle = (self.time * 0.02 + i * 0.4) % (2 * math.pi)
-                base_x = self.width // 2
-                base_y = self.height // 2
-                radius = (self.time * 2 + i * 8) % 300
-                x = base_x + math.cos(angle) * radius
-                y = base_y + math.sin(angle) * radius
-            else:  # Circular/spiral
-                angle = (self.time * 0.03 + i * 0.5) % (2 * math.pi)
-                spiral_radius = 50 + (i % 10) * 25 + math.sin(self.time * 0.08) * 30
-                x = self.width // 2 + math.cos(angle) * spiral_radius
-                y = self.height // 2 + math.sin(angle) * spiral_radius
-            
-            # Ensure particles stay on screen
-            x = max(0, min(self.width, x))
-            y = max(0, min(self.height, y))
-            
-            size = max(1.5, 2 + math.sin(self.time * 0.15 + i * 0.5) * 2.5)
-            brightness = max(60, min(255, int(100 + math.sin(self.time * 0.2 + i * 0.6) * 100)))
-            color = tuple(min(255, max(0, c * brightness // 255)) for c in COLOR_BUTTON[:3])
-            pygame.draw.circle(surface, color, (int(x), int(y)), int(size))
+        self.particles.draw(surface, self.time)
     
     def draw_exit_button(self, surface, text, rect, hover=False):
         """Draw exit button with red accent"""
@@ -223,15 +196,16 @@ class Menu:
         border_color = COLOR_TEXT_BRIGHT if hover else COLOR_TEXT
         pygame.draw.rect(surface, border_color, rect, width=2, border_radius=10)
         
-        text_surf = self.font_normal.render(text, True, COLOR_TEXT_BRIGHT)
+        text_surf = TEXT.render(self.font_normal, text, COLOR_TEXT_BRIGHT)
         text_rect = text_surf.get_rect(center=rect.center)
-        shadow_surf = self.font_normal.render(text, True, (0, 0, 0))
+        shadow_surf = TEXT.render(self.font_normal, text, (0, 0, 0))
         surface.blit(shadow_surf, (text_rect.x + 2, text_rect.y + 2))
         surface.blit(text_surf, text_rect)
     
     def run(self):
         run = True
-        clock = pygame.time.Clock()
+        self.scheduler = FrameScheduler("menu", self.FPS, self.IDLE_FPS)
+        start_hover = False
         
         # Button positions (centered)
         button_width = 280
@@ -244,19 +218,28 @@ class Menu:
         start_button = pygame.Rect(self.width // 2 - button_width // 2, start_y, button_width, button_height_start)
         exit_button = pygame.Rect(self.width // 2 - button_width // 2, start_y + button_height_start + button_spacing, button_width, button_height_exit)
         
-        start_hover = False
+        # Mode buttons side by side below the panel
+        mode_width = 200
+        mode_height = 50
+        mode_y = start_y + total_height + 65
+        mode_buttons = [
+            (MODE_ONLINE, "ONLINE", pygame.Rect(self.width // 2 - mode_width - 10, mode_y, mode_width, mode_height)),
+            (MODE_AI, "PROTI POČÍTAČU", pygame.Rect(self.width // 2 + 10, mode_y, mode_width, mode_height)),
+        ]
+        
         exit_hover = False
         
         while run:
-            clock.tick(60)
-            self.time += 1
+            # The start button pulses while hovered, so that needs full rate; the rest can idle
+            events, dt = self.scheduler.frame(animating=start_hover)
+            self.time += dt * ANIMATION_RATE
             mouse_pos = pygame.mouse.get_pos()
             
             # Check hover states
             start_hover = start_button.collidepoint(mouse_pos)
             exit_hover = exit_button.collidepoint(mouse_pos)
             
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     return None, None
                 
@@ -265,6 +248,9 @@ class Menu:
                         return self.selected_mode, True
                     elif exit_button.collidepoint(mouse_pos):
                         return None, None  # Exit game
+                    for mode, _, rect in mode_buttons:
+                        if rect.collidepoint(mouse_pos):
+                            self.selected_mode = mode
             
             # Draw everything
             self.draw_gradient_background(self.win)
@@ -292,19 +278,19 @@ class Menu:
             
             # Title with glow effect
             title_text = "BATTLESHIPS"
-            title_surf = self.font_title.render(title_text, True, COLOR_TEXT_BRIGHT)
+            title_surf = TEXT.render(self.font_title, title_text, COLOR_TEXT_BRIGHT)
             title_rect = title_surf.get_rect(center=(self.width // 2, 100))
             
             # Title glow
             for i in range(8):
                 glow_intensity = 35 - i * 3
                 glow_color = tuple(min(255, c + glow_intensity) for c in COLOR_BUTTON[:3])
-                glow_surf = self.font_title.render(title_text, True, glow_color)
+                glow_surf = TEXT.render(self.font_title, title_text, glow_color)
                 glow_rect = glow_surf.get_rect(center=(self.width // 2 + i, 100 + i))
                 self.win.blit(glow_surf, glow_rect)
             
             # Title shadow
-            shadow_surf = self.font_title.render(title_text, True, (0, 0, 0))
+            shadow_surf = TEXT.render(self.font_title, title_text, (0, 0, 0))
             shadow_rect = shadow_surf.get_rect(center=(self.width // 2 + 4, 104))
             self.win.blit(shadow_surf, shadow_rect)
             
@@ -318,6 +304,11 @@ class Menu:
             # Exit button
             self.draw_exit_button(self.win, "UKONČIŤ", exit_button, hover=exit_hover)
             
+            # Game mode
+            for mode, text, rect in mode_buttons:
+                self.draw_mode_button(self.win, text, rect, selected=mode == self.selected_mode,
+                                      hover=rect.collidepoint(mouse_pos))
+            
             pygame.display.update()
         
         return None, None
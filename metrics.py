@@ -0,0 +1,306 @@
+import json
+import time
+
+# Request stages the server times separately, so it is clear where a slow request spent its time
+STAGES = ("decode", "shot", "encode", "send", "request", "broadcast")
+
+
+class Histogram:
+    """Latency histogram with power-of-two microsecond buckets: cheap to record, good to ~2x"""
+
+    BUCKETS = 25  # Up to 2**24 us, about 17 s; anything slower lands in the last bucket
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = int(seconds * 1e6)
+        self.counts[min(micros.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound in seconds of the bucket holding the q-th percentile (q in 0..100)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def merge_dict(self, other):
+        """Add in another histogram's to_dict(), e.g. from a different worker process"""
+        for bound, count in other["buckets_us"].items():
+            self.counts[min(int(bound).bit_length() - 1, self.BUCKETS - 1)] += count
+        self.count += other["count"]
+        self.total += other["mean_us"] * other["count"] / 1e6
+        self.max = max(self.max, other["max_us"] / 1e6)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count * 1e6, 1) if self.count else 0.0,
+            "p50_us": round(self.percentile(50) * 1e6, 1),
+            "p99_us": round(self.percentile(99) * 1e6, 1),
+            "max_us": round(self.max * 1e6, 1),
+            "buckets_us": {1 << bucket: count for bucket, count in enumerate(self.counts) if count},
+        }
+
+
+class ConnectionStats:
+    """Traffic and request latency for one client connection"""
+
+    def __init__(self, conn_id, addr, room_id, player):
+        self.conn_id = conn_id
+        self.addr = addr
+        self.room_id = room_id
+        self.player = player
+        self.opened = time.monotonic()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.latency = Histogram()
+
+    def to_dict(self):
+        return {
+            "addr": str(self.addr),
+            "room": self.room_id,
+            "player": self.player,
+            "age_s": round(time.monotonic() - self.opened, 1),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "latency": self.latency.to_dict(),
+        }
+
+
+class ServerMetrics:
+    """Counters for the whole server; everything runs on the event loop, so no locking is needed"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.connections = {}  # conn_id -> ConnectionStats, open connections only
+        self.next_conn_id = 0
+        self.total_connections = 0
+        self.resumes = 0  # Connections that picked up a dropped session
+        self.handoffs = 0  # Connections passed to the cluster worker that owns them
+        self.rooms = 0
+        self.spectators = 0
+        self.spectator_bytes = 0  # Fan-out traffic, kept apart from the players' bytes_out
+        self.spectator_frames = 0
+        self.spectator_skips = 0  # Times a lagging viewer was skipped ahead to a snapshot
+        self.spectator_drops = 0  # Viewers disconnected for never keeping up
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.last_summary = (self.started, 0, 0)  # (time, messages_in, messages_out) at the last summary
+
+    def open_connection(self, addr, room_id, player):
+        conn = ConnectionStats(self.next_conn_id, addr, room_id, player)
+        self.connections[conn.conn_id] = conn
+        self.next_conn_id += 1
+        self.total_connections += 1
+        return conn
+
+    def close_connection(self, conn):
+        self.connections.pop(conn.conn_id, None)
+
+    def received(self, conn, size):
+        conn.bytes_in += size
+        conn.messages_in += 1
+        self.bytes_in += size
+        self.messages_in += 1
+
+    def sent(self, conn, size):
+        conn.bytes_out += size
+        conn.messages_out += 1
+        self.bytes_out += size
+        self.messages_out += 1
+
+    def spectator_sent(self, size):
+        self.spectator_bytes += size
+        self.spectator_frames += 1
+
+    def time(self, stage, seconds):
+        self.stages[stage].record(seconds)
+
+    def request_done(self, conn, seconds):
+        conn.latency.record(seconds)
+        self.stages["request"].record(seconds)
+
+    def snapshot(self):
+        """Everything as a JSON-ready dict"""
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime_s": round(uptime, 1),
+            "active_connections": len(self.connections),
+            "total_connections": self.total_connections,
+            "resumes": self.resumes,
+            "handoffs": self.handoffs,
+            "active_rooms": self.rooms,
+            "spectators": self.spectators,
+            "spectator_bytes": self.spectator_bytes,
+            "spectator_frames": self.spectator_frames,
+            "spectator_skips": self.spectator_skips,
+            "spectator_drops": self.spectator_drops,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "messages_per_s": round((self.messages_in + self.messages_out) / uptime, 1) if uptime else 0.0,
+            "stages": {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+            "connections": [conn.to_dict() for conn in self.connections.values()],
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_text(self):
+        """Human-readable report for the stats endpoint"""
+        stats = self.snapshot()
+        lines = [
+            f"uptime {stats['uptime_s']} s",
+            f"connections {stats['active_connections']} active, {stats['total_connections']} total, "
+            f"{stats['resumes']} resumed",
+            f"rooms {stats['active_rooms']} active",
+            f"spectators {stats['spectators']}, {stats['spectator_frames']} frames / {stats['spectator_bytes']} B sent, "
+            f"{stats['spectator_skips']} skipped ahead, {stats['spectator_drops']} dropped",
+            f"traffic in {stats['bytes_in']} B / {stats['messages_in']} msgs, "
+            f"out {stats['bytes_out']} B / {stats['messages_out']} msgs, {stats['messages_per_s']} msgs/s",
+            "",
+            f"{'stage':<10} {'count':>9} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}",
+        ]
+        for stage, hist in stats["stages"].items():
+            lines.append(f"{stage:<10} {hist['count']:>9} {hist['mean_us']:>9} {hist['p50_us']:>9} "
+                         f"{hist['p99_us']:>9} {hist['max_us']:>9}")
+        lines.append("")
+        lines.append(f"{'connection':<24} {'room':>5} {'in B':>9} {'out B':>9} {'msgs':>7} {'p50 us':>9} {'p99 us':>9}")
+        for conn in stats["connections"]:
+            latency = conn["latency"]
+            lines.append(f"{conn['addr']:<24} {conn['room']:>5} {conn['bytes_in']:>9} {conn['bytes_out']:>9} "
+                         f"{conn['messages_in']:>7} {latency['p50_us']:>9} {latency['p99_us']:>9}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line for the periodic log, with message rates since the previous summary"""
+        now = time.monotonic()
+        then, messages_in, messages_out = self.last_summary
+        elapsed = now - then
+        rate_in = (self.messages_in - messages_in) / elapsed if elapsed else 0.0
+        rate_out = (self.messages_out - messages_out) / elapsed if elapsed else 0.0
+        self.last_summary = (now, self.messages_in, self.messages_out)
+        request = self.stages["request"]
+        shot = self.stages["shot"]
+        return (f"[stats] {len(self.connections)} conns, {self.rooms} rooms, "
+                f"{rate_in:.1f} msgs/s in, {rate_out:.1f} msgs/s out, "
+                f"{self.bytes_in} B in, {self.bytes_out} B out, "
+                f"request p50 {request.percentile(50) * 1e6:.0f} us p99 {request.percentile(99) * 1e6:.0f} us, "
+                f"shot p99 {shot.percentile(99) * 1e6:.0f} us")
+
+
+class ClusterMetrics:
+    """The supervisor's view of its workers: their latest ServerMetrics snapshots, summed up"""
+
+    STALE_AFTER = 5  # Seconds without a report before a live worker counts as unhealthy
+    TOTALS = ("active_connections", "total_connections", "resumes", "handoffs", "active_rooms", "spectators",
+              "bytes_in", "bytes_out", "messages_in", "messages_out", "messages_per_s")
+
+    def __init__(self, workers):
+        self.started = time.monotonic()
+        self.workers = [{"pid": None, "alive": False, "restarts": -1, "reported": None, "stats": None}
+                        for _ in range(workers)]
+
+    def started_worker(self, index, pid):
+        worker = self.workers[index]
+        worker.update(pid=pid, alive=True, reported=None, stats=None)
+        worker["restarts"] += 1
+
+    def stopped_worker(self, index):
+        self.workers[index]["alive"] = False
+
+    def report(self, index, pid, stats):
+        worker = self.workers[index]
+        if worker["pid"] == pid:  # Ignore a report from before a restart
+            worker.update(reported=time.monotonic(), stats=stats)
+
+    def healthy(self, worker, now):
+        return worker["alive"] and worker["reported"] is not None and now - worker["reported"] < self.STALE_AFTER
+
+    def snapshot(self):
+        now = time.monotonic()
+        totals = dict.fromkeys(self.TOTALS, 0)
+        stages = {stage: Histogram() for stage in STAGES}
+        workers = []
+        for index, worker in enumerate(self.workers):
+            stats = worker["stats"] or {}
+            for key in self.TOTALS:
+                totals[key] += stats.get(key, 0)
+            for stage, hist in stats.get("stages", {}).items():
+                stages[stage].merge_dict(hist)
+            request = stats.get("stages", {}).get("request", Histogram().to_dict())
+            workers.append({
+                "worker": index,
+                "pid": worker["pid"],
+                "healthy": self.healthy(worker, now),
+                "restarts": worker["restarts"],
+                "report_age_s": round(now - worker["reported"], 1) if worker["reported"] is not None else None,
+                "connections": stats.get("active_connections", 0),
+                "rooms": stats.get("active_rooms", 0),
+                "messages_per_s": stats.get("messages_per_s", 0.0),
+                "request_p50_us": request["p50_us"],
+                "request_p99_us": request["p99_us"],
+            })
+        totals["messages_per_s"] = round(totals["messages_per_s"], 1)
+        return {
+            "uptime_s": round(now - self.started, 1),
+            "healthy_workers": sum(1 for worker in workers if worker["healthy"]),
+            **totals,
+            "stages": {stage: histogram.to_dict() for stage, histogram in stages.items()},
+            "workers": workers,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_text(self):
+        stats = self.snapshot()
+        lines = [
+            f"uptime {stats['uptime_s']} s, {stats['healthy_workers']}/{len(stats['workers'])} workers healthy",
+            f"connections {stats['active_connections']} active, {stats['total_connections']} total, "
+            f"{stats['resumes']} resumed, {stats['handoffs']} handed over",
+            f"rooms {stats['active_rooms']} active, spectators {stats['spectators']}",
+            f"traffic in {stats['bytes_in']} B / {stats['messages_in']} msgs, "
+            f"out {stats['bytes_out']} B / {stats['messages_out']} msgs, {stats['messages_per_s']} msgs/s",
+            "",
+            f"{'stage':<10} {'count':>9} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}",
+        ]
+        for stage, hist in stats["stages"].items():
+            lines.append(f"{stage:<10} {hist['count']:>9} {hist['mean_us']:>9} {hist['p50_us']:>9} "
+                         f"{hist['p99_us']:>9} {hist['max_us']:>9}")
+        lines.append("")
+        lines.append(f"{'worker':<7} {'pid':>7} {'health':>7} {'restarts':>8} {'conns':>7} {'rooms':>6} "
+                     f"{'msgs/s':>9} {'p50 us':>9} {'p99 us':>9}")
+        for worker in stats["workers"]:
+            lines.append(f"{worker['worker']:<7} {worker['pid'] or '-':>7} {'ok' if worker['healthy'] else 'DOWN':>7} "
+                         f"{worker['restarts']:>8} {worker['connections']:>7} {worker['rooms']:>6} "
+                         f"{worker['messages_per_s']:>9} {worker['request_p50_us']:>9} {worker['request_p99_us']:>9}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        stats = self.snapshot()
+        request = stats["stages"]["request"]
+        return (f"[cluster] {stats['healthy_workers']}/{len(stats['workers'])} workers healthy, "
+                f"{stats['active_connections']} conns, {stats['active_rooms']} rooms, "
+                f"{stats['messages_per_s']} msgs/s, request p50 {request['p50_us']:.0f} us p99 {request['p99_us']:.0f} us")
@@ -1,6 +1,32 @@
+import queue
 import socket
-import pickle
 import sys
+import threading
+import time
+import protocol
+
+RECONNECT_WINDOW = 25  # Seconds to keep trying after a drop; the server holds the seat for 30
+RECONNECT_DELAY = 0.25  # First retry delay, doubled after every failed attempt
+RECONNECT_MAX_DELAY = 4
+
+
+def apply_event(game, opponent, event):
+    """Apply one server event to the local copies of both games"""
+    if event.kind == protocol.EV_SHOT:
+        if event.player == game.player_id:
+            shooter, target = game, opponent
+        else:
+            shooter, target = opponent, game
+        shooter.shoot(event.x, event.y)
+        shooter.update_opponent_board(event.x, event.y, event.result)
+        target.receive_shot(event.x, event.y)
+    elif event.kind == protocol.EV_TURN:
+        game.current_turn = opponent.current_turn = event.player
+    elif event.kind == protocol.EV_GAME_OVER:
+        game.winner = opponent.winner = event.player
+        # Already set when the last ship sank, but not when the loser forfeited by not coming back
+        loser = opponent if game.player_id == event.player else game
+        loser.game_over = True
 
 
 class Network:
@@ -9,6 +35,21 @@ class Network:
         self.server = "192.168.56.1"
         self.port = 5555
         self.addr = (self.server, self.port)
+        self.seq = 0  # Last server event applied locally
+        self.token = protocol.NO_TOKEN  # Session token, so a dropped connection can pick up where it left off
+        self.opponent = None
+        self.opponent_present = True  # False while the opponent's connection is down
+        self.commands = queue.Queue()  # Shots that could not be sent, waiting for a reconnect
+        self.send_lock = threading.Lock()  # Shots go out from the render thread, heartbeats from the worker
+        self.wake = threading.Event()
+        self.resyncing = False
+        self.worker = None
+        self.running = False
+        self.connected = False
+        self.last_sent = 0.0  # monotonic time of the last frame sent, for the heartbeat
+        self.state = None  # (own, opponent) as last published by the worker
+        self.published = None
+        self.on_update = None  # Called from the worker after publishing new state, to wake the render loop
         self.p = self.connect()
 
     def getP(self):
@@ -20,12 +61,18 @@ class Network:
             self.client.settimeout(5)  # 5 second timeout
             self.client.connect(self.addr)
             print("Connected! Waiting for game data...")
-            data = self.client.recv(2048)
-            if not data:
-                print("Error: Server closed connection")
+            self.handshake(self.client)
+            msg_type, body = protocol.recv_message(self.client)
+            if msg_type != protocol.MSG_SNAPSHOT:
+                print(f"Error: Unexpected message type {msg_type} from server")
                 return None
             self.client.settimeout(None)  # Remove timeout after connection
-            return pickle.loads(data)
+            self.seq, game, self.opponent = body
+            self.connected = True
+            return game
+        except ConnectionError:
+            print("Error: Server closed connection")
+            return None
         except socket.timeout:
             print(f"Error: Connection timeout - couldn't reach {self.server}:{self.port}")
             print("Make sure:")
@@ -44,13 +91,178 @@ class Network:
             traceback.print_exc()
             return None
 
+    def handshake(self, sock):
+        """Send our token and seq on sock, keep the token the server answers with and return the session
+        status. The hello goes out under send_lock like every other write; the wait for the answer does
+        not hold it, or shoot() would stall the render thread for as long"""
+        with self.send_lock:
+            sock.sendall(protocol.encode_hello(self.token, self.seq))
+        msg_type, body = protocol.recv_message(sock)
+        if msg_type != protocol.MSG_SESSION:
+            raise protocol.ProtocolError(f"Expected a session, got message type {msg_type}")
+        token, status = body
+        if status != protocol.SESSION_EXPIRED:
+            self.token = token
+        return status
+
+    def reconnect(self):
+        """After a drop, reconnect with backoff and resume the session; return True once back in sync"""
+        deadline = time.monotonic() + RECONNECT_WINDOW
+        delay = RECONNECT_DELAY
+        self.client.close()
+        while self.running and time.monotonic() < deadline:
+            sock = None
+            try:
+                # Only a resumed session becomes self.client; until then shoot() keeps queueing
+                sock = socket.create_connection(self.addr, timeout=5)
+                if self.handshake(sock) != protocol.SESSION_RESUMED:
+                    print("Reconnect refused, the server has given up our seat")
+                    sock.close()
+                    return False
+                msg_type, body = protocol.recv_message(sock)
+                if msg_type != protocol.MSG_EVENTS:
+                    raise protocol.ProtocolError(f"Unexpected message type {msg_type}")
+                sock.settimeout(protocol.HEARTBEAT_INTERVAL)
+                with self.send_lock:
+                    # Under the lock, so shoot() either queued before this or sends on the new socket after
+                    shots = self.take_commands()
+                    try:
+                        sock.sendall(b"".join([protocol.encode_shoot(x, y) for x, y in shots]))
+                    except OSError:
+                        for shot in shots:
+                            self.commands.put(shot)
+                        raise
+                    self.client = sock  # The server ignores any shot it already applied
+                    self.connected = True
+                self.resyncing = False
+                self.receive(msg_type, body)
+                print(f"Reconnected at seq {self.seq}")
+                return True
+            except (OSError, protocol.ProtocolError) as e:
+                print(f"Reconnect failed: {e}")
+                self.connected = False
+                if sock is not None:
+                    sock.close()
+            self.wake.wait(delay)
+            self.wake.clear()
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        return False
+
+    def apply_events(self, events):
+        """Apply a batch of server events in order; return True if one was missing"""
+        for event in events:
+            if event.seq <= self.seq:
+                continue
+            if event.seq != self.seq + 1:
+                return True  # Missed something, the local copies can't be trusted
+            if event.kind == protocol.EV_PRESENCE and event.player != self.p.player_id:
+                self.opponent_present = bool(event.result)
+            apply_event(self.p, self.opponent, event)
+            self.seq = event.seq
+        return False
+
+    def receive(self, msg_type, body):
+        """Apply one frame from the server, asking for a snapshot if events went missing"""
+        if msg_type == protocol.MSG_SNAPSHOT:
+            self.seq, self.p, self.opponent = body
+            self.resyncing = False
+        elif msg_type != protocol.MSG_EVENTS:
+            raise protocol.ProtocolError(f"Unexpected message type {msg_type}")
+        elif self.apply_events(body) and not self.resyncing:
+            self.resyncing = True  # Later events are dropped until the snapshot arrives
+            self.send(protocol.encode_resync())
+
     def send(self, data):
+        with self.send_lock:
+            self.client.sendall(data)
+            self.last_sent = time.monotonic()
+
+    def shoot(self, x, y):
+        """Send a shot right away, or queue it while the connection is down; its result comes back
+        with the next events"""
+        with self.send_lock:
+            if not self.connected:
+                self.commands.put((x, y))  # Sent after the reconnect
+                return
         try:
-            self.client.send(pickle.dumps(data))
-            return pickle.loads(self.client.recv(2048))
-        except socket.error as e:
+            self.send(protocol.encode_shoot(x, y))
+        except OSError as e:
             print(f"Network error: {e}")
-            return None
-        except Exception as e:
-            print(f"Error sending data: {e}")
-            return None
\ No newline at end of file
+            self.commands.put((x, y))  # Sent after the reconnect
+
+    def take_commands(self):
+        shots = []
+        while True:
+            try:
+                shots.append(self.commands.get_nowait())
+            except queue.Empty:
+                return shots
+
+    def listen(self):
+        """Apply what the server pushes until the connection fails. A heartbeat goes out every
+        HEARTBEAT_INTERVAL however busy the opponent keeps us, since the server drops a player it has
+        not heard from in twice that; the server answering nothing for as long means it is gone."""
+        interval = protocol.HEARTBEAT_INTERVAL
+        last_received = time.monotonic()
+        while self.running:
+            now = time.monotonic()
+            if now - self.last_sent >= interval:
+                self.send(protocol.encode_sync(self.seq))
+                now = self.last_sent
+            self.client.settimeout(max(0.1, min(self.last_sent + interval, last_received + 2 * interval) - now))
+            try:
+                msg_type, body = protocol.recv_message(self.client)
+            except socket.timeout:
+                if time.monotonic() - last_received >= 2 * interval:
+                    print("Network error: server stopped answering")
+                    return
+                continue
+            last_received = time.monotonic()
+            self.receive(msg_type, body)
+            if self.published != (self.p, self.seq):
+                self.publish()
+
+    def start(self):
+        """Listen in a background thread so callers never block on the network"""
+        self.publish()
+        self.running = True
+        self.client.settimeout(protocol.HEARTBEAT_INTERVAL)
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        try:
+            self.client.shutdown(socket.SHUT_RDWR)  # Wakes the worker out of recv
+        except OSError:
+            pass
+        if self.worker is not None:
+            self.worker.join(timeout=1)
+        self.client.close()
+
+    def latest(self):
+        """Most recent (own, opponent) states received from the server"""
+        return self.state
+
+    def publish(self):
+        # Hand the render loop its own copies so it never sees a half-applied event; snapshot() copies
+        # the shots but not the fleet, so this stays cheap on large boards
+        self.state = (self.p.snapshot(), self.opponent.snapshot())
+        self.published = (self.p, self.seq)
+        if self.on_update is not None:
+            self.on_update()
+
+    def run_worker(self):
+        while self.running:
+            try:
+                self.listen()
+            except (OSError, protocol.ProtocolError) as e:
+                if self.running:
+                    print(f"Network error: {e}")
+            if not self.running:
+                break
+            self.connected = False
+            if not self.reconnect():
+                break
+            self.publish()
@@ -0,0 +1,130 @@
+import math
+import numpy as np
+import pygame
+
+TWO_PI = 2 * math.pi
+
+
+def wave(t, i, time_rate, index_rate):
+    """sin(t * time_rate + i * index_rate) for every particle index at once"""
+    return np.sin(t * time_rate + i * index_rate)
+
+
+class ParticleField:
+    """A particle effect whose positions, sizes and colors are functions of time, evaluated
+    for all particles in a handful of NumPy operations and drawn with one blits() call"""
+
+    def __init__(self, count, color, motion, size, brightness, min_size=0.0,
+                 brightness_limits=None, brightness_scale=255, bounds=None):
+        self.index = np.arange(count, dtype=np.float64)
+        self.color = np.array(color[:3], dtype=np.int64)
+        self.motion = motion  # motion(i, t, center_x, center_y) -> (x, y) arrays
+        self.size = size  # (base, amplitude, time_rate, index_rate)
+        self.brightness = brightness  # (base, amplitude, time_rate, index_rate)
+        self.min_size = min_size
+        self.brightness_limits = brightness_limits  # (low, high) clamp, or None
+        self.brightness_scale = brightness_scale
+        self.bounds = bounds  # (width, height) to keep particles on screen, or None
+        self.sprites = {}  # (radius, color) -> Surface
+
+    def evaluate(self, t, center=(0, 0)):
+        """Integer x, y, radius arrays and an (n, 3) color array for time t"""
+        i = self.index
+        x, y = self.motion(i, t, center[0], center[1])
+        if self.bounds is not None:
+            x = np.clip(x, 0, self.bounds[0])
+            y = np.clip(y, 0, self.bounds[1])
+
+        base, amplitude, time_rate, index_rate = self.size
+        size = np.maximum(self.min_size, base + wave(t, i, time_rate, index_rate) * amplitude)
+
+        base, amplitude, time_rate, index_rate = self.brightness
+        brightness = np.trunc(base + wave(t, i, time_rate, index_rate) * amplitude).astype(np.int64)
+        if self.brightness_limits is not None:
+            brightness = np.clip(brightness, *self.brightness_limits)
+        colors = np.clip(self.color[None, :] * brightness[:, None] // self.brightness_scale, 0, 255)
+
+        return x.astype(np.int64), y.astype(np.int64), size.astype(np.int64), colors
+
+    def sprite(self, radius, color):
+        key = (radius, color)
+        surface = self.sprites.get(key)
+        if surface is None:
+            side = radius * 2 + 2
+            surface = pygame.Surface((side, side))
+            colorkey = (0, 0, 0) if color != (0, 0, 0) else (255, 255, 255)
+            surface.fill(colorkey)
+            surface.set_colorkey(colorkey)
+            pygame.draw.circle(surface, color, (radius + 1, radius + 1), radius)
+            self.sprites[key] = surface
+        return surface
+
+    def draw(self, surface, t, center=(0, 0)):
+        x, y, radius, colors = self.evaluate(t, center)
+        visible = radius > 0
+        x, y, radius, colors = x[visible], y[visible], radius[visible], colors[visible]
+        sprite = self.sprite
+        surface.blits([(sprite(r, c), (px - r - 1, py - r - 1))
+                       for px, py, r, c in zip(x.tolist(), y.tolist(), radius.tolist(),
+                                               map(tuple, colors.tolist()))],
+                      doreturn=False)
+
+
+def menu_motion(width, height):
+    """Four movement patterns (horizontal, vertical, outward spiral, orbit) by index % 4"""
+    def motion(i, t, center_x, center_y):
+        pattern = i % 4
+        x = np.empty_like(i)
+        y = np.empty_like(i)
+
+        sel = pattern == 0  # Horizontal moving
+        x[sel] = (t * 4 + i[sel] * 20) % (width + 100) - 50
+        y[sel] = height // 2 + np.sin(t * 0.05 + i[sel] * 0.2) * 100
+
+        sel = pattern == 1  # Vertical moving
+        x[sel] = width // 2 + np.cos(t * 0.04 + i[sel] * 0.3) * 200
+        y[sel] = (t * 3 + i[sel] * 15) % (height + 80) - 40
+
+        sel = pattern == 2  # Diagonal
+        angle = (t * 0.02 + i[sel] * 0.4) % TWO_PI
+        radius = (t * 2 + i[sel] * 8) % 300
+        x[sel] = width // 2 + np.cos(angle) * radius
+        y[sel] = height // 2 + np.sin(angle) * radius
+
+        sel = pattern == 3  # Circular/spiral
+        angle = (t * 0.03 + i[sel] * 0.5) % TWO_PI
+        radius = 50 + (i[sel] % 10) * 25 + math.sin(t * 0.08) * 30
+        x[sel] = width // 2 + np.cos(angle) * radius
+        y[sel] = height // 2 + np.sin(angle) * radius
+        return x, y
+    return motion
+
+
+def ring_motion(count, spin, distance, wobble, wobble_rate):
+    """Particles spread evenly on a circle around the center, spinning and breathing"""
+    def motion(i, t, center_x, center_y):
+        angle = (t * spin + i * (TWO_PI / count)) % TWO_PI
+        dist = distance + np.sin(t * wobble_rate + i) * wobble
+        return center_x + np.cos(angle) * dist, center_y + np.sin(angle) * dist
+    return motion
+
+
+def menu_particles(width, height, color, count=50):
+    """Background particles for the menu"""
+    return ParticleField(count, color, menu_motion(width, height),
+                         size=(2, 2.5, 0.15, 0.5), min_size=1.5,
+                         brightness=(100, 100, 0.2, 0.6), brightness_limits=(60, 255),
+                         bounds=(width, height))
+
+
+def victory_particles(color, count=30):
+    """Ring around the winner text"""
+    return ParticleField(count, color, ring_motion(count, 0.02, 120, 30, 0.05),
+                         size=(4, 2.5, 0.1, 1), brightness=(150, 105, 0.15, 1))
+
+
+def loser_particles(color, count=15):
+    """Smaller, dimmer ring around the loser text"""
+    return ParticleField(count, color, ring_motion(count, 0.015, 60, 15, 0.08),
+                         size=(2, 1.5, 0.12, 1), brightness=(120, 80, 0.18, 1),
+                         brightness_scale=200)
@@ -0,0 +1,112 @@
+import random
+from collections import namedtuple
+from functools import lru_cache
+from board import DENSE_MAX
+
+# One way to put a ship on the board; mask uses the same bit layout as board.Board
+Placement = namedtuple("Placement", "mask x y length horizontal")
+
+QUICK_TRIES = 16  # Random guesses per ship before falling back to listing every free spot
+SPARSE_TRIES = 1000  # Random guesses per ship on a large board before giving up
+SEARCH_BUDGET = 20000  # Placements the search may try before deciding the fleet does not fit
+
+
+@lru_cache(maxsize=None)
+def placements(size, length):
+    """Every position a ship of this length can take on an empty size x size board"""
+    options = []
+    run = (1 << length) - 1
+    column = 0
+    for i in range(length):
+        column |= 1 << (i * size)
+    for y in range(size):
+        for x in range(size - length + 1):
+            options.append(Placement(run << (y * size + x), x, y, length, True))
+    if length > 1:  # A one-cell ship would be listed twice
+        for y in range(size - length + 1):
+            for x in range(size):
+                options.append(Placement(column << (y * size + x), x, y, length, False))
+    return tuple(options)
+
+
+def place(size, lengths, occupied, rng, chosen, budget):
+    """Depth-first search that fills chosen with a placement per length; False if impossible or
+    if the search used up budget, a one-item list counting the placements it may still try"""
+    if len(chosen) == len(lengths):
+        return True
+    if budget[0] <= 0:
+        return False
+    budget[0] -= 1
+    options = placements(size, lengths[len(chosen)])
+    if not options:
+        return False
+
+    # Most of the time a blind guess lands on free water, so try that first
+    for _ in range(QUICK_TRIES):
+        option = rng.choice(options)
+        if not option.mask & occupied:
+            chosen.append(option)
+            if place(size, lengths, occupied | option.mask, rng, chosen, budget):
+                return True
+            chosen.pop()
+            break
+
+    # Crowded board or dead end: sample only from what is actually free
+    free = [option for option in options if not option.mask & occupied]
+    rng.shuffle(free)
+    for option in free:
+        if budget[0] <= 0:
+            return False
+        chosen.append(option)
+        if place(size, lengths, occupied | option.mask, rng, chosen, budget):
+            return True
+        chosen.pop()
+    return False
+
+
+def sparse_fleet(size, lengths, rng):
+    """random_fleet for large boards, where listing every placement would be far too big.
+    Fleets there are thin, so guessing until a spot is free almost always works first time."""
+    occupied = set()
+    fleet = []
+    for length in lengths:
+        for _ in range(SPARSE_TRIES):
+            horizontal = rng.random() < 0.5
+            if horizontal:
+                x, y = rng.randrange(size - length + 1), rng.randrange(size)
+            else:
+                x, y = rng.randrange(size), rng.randrange(size - length + 1)
+            start = y * size + x
+            cells = frozenset(range(start, start + (1 if horizontal else size) * length,
+                                    1 if horizontal else size))
+            if occupied.isdisjoint(cells):
+                occupied.update(cells)
+                fleet.append(Placement(cells, x, y, length, horizontal))
+                break
+        else:
+            raise ValueError(f"Could not fit a ship of length {length} on the {size}x{size} board")
+    return fleet
+
+
+def random_fleet(size, lengths, rng=random):
+    """Random non-overlapping placements for ships of the given lengths, in the same order.
+    Raises ValueError if the fleet cannot fit on the board at all."""
+    if sum(lengths) > size * size:
+        raise ValueError(f"Ships {list(lengths)} cover more cells than a {size}x{size} board has")
+    if size > DENSE_MAX:
+        return sparse_fleet(size, lengths, rng)  # Masks are cell sets there, see board.SparseBoard
+    # Big ships first: they have the fewest options, so dead ends show up early
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    chosen = []
+    if not place(size, [lengths[i] for i in order], 0, rng, chosen, [SEARCH_BUDGET]):
+        raise ValueError(f"Ships {list(lengths)} do not fit on a {size}x{size} board "
+                         f"(no placement found in {SEARCH_BUDGET} tries)")
+    fleet = [None] * len(lengths)
+    for i, option in zip(order, chosen):
+        fleet[i] = option
+    return fleet
+
+
+def random_fleets(count, size, lengths, rng=random):
+    """count independent random fleets, e.g. for simulations and tournaments"""
+    return [random_fleet(size, lengths, rng) for _ in range(count)]
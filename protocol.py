@@ -0,0 +1,292 @@
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from itertools import chain
+from board import SparseBoard, make_board
+from engine import BattleshipsGame, MAX_BOARD_SIZE
+
+# Every frame is: payload length, protocol version, message type, payload
+PROTOCOL_VERSION = 5
+FRAME_HEADER = struct.Struct("!IBB")
+MAX_PAYLOAD = 1 << 20  # Anything bigger is a broken or hostile peer
+MAX_SNAPSHOT = 1 << 26  # Snapshots grow with a large-board match, roughly 16 bytes per shot fired
+HEARTBEAT_INTERVAL = 10  # Seconds between a player's heartbeats (MSG_SYNC); silent for twice that and it is gone
+
+# Message types, client -> server
+MSG_HELLO = 1       # First frame on every connection: session token (zeros for a new player) and seq
+MSG_SHOOT = 3       # Shot command (x, y)
+MSG_SYNC = 6        # "I have applied everything up to seq", answered with MSG_EVENTS; doubles as a heartbeat
+MSG_RESYNC = 7      # Client saw a gap, answered with MSG_SNAPSHOT
+MSG_WATCH = 8       # Instead of a hello: spectate a room, answered with MSG_SNAPSHOT and then a stream of MSG_EVENTS
+# Message types, server -> client
+MSG_SESSION = 2     # Answer to MSG_HELLO: token and status, then a snapshot (new) or missed events (resumed)
+MSG_SNAPSHOT = 4    # seq plus (own, opponent) full states
+MSG_EVENTS = 5      # Events newer than the client's seq: the answer to a command, or pushed when the room changes
+
+# Event kinds
+EV_SHOT = 1         # player fired at (x, y), result 1 on hit
+EV_TURN = 2         # It is now player's turn
+EV_GAME_OVER = 3    # player won
+EV_SUNK = 4         # player sank the opponent's ship number result with the shot at (x, y)
+EV_PRESENCE = 5     # player connected (result 1) or dropped (result 0)
+
+# MSG_SESSION status
+SESSION_NEW = 0       # Seated in a room; a snapshot follows
+SESSION_RESUMED = 1   # Back in the same seat; the events since the hello's seq follow
+SESSION_EXPIRED = 2   # Token unknown or its seat already given up; the server closes the connection
+
+Event = namedtuple("Event", "seq kind player x y result")
+
+# player_id, board_size, flags, current_turn, winner, ships, shots fired, hits
+GAME_HEADER = struct.Struct("!BHBBbIII")
+CELL = struct.Struct("!HH")
+SEQ = struct.Struct("!I")
+TOKEN_SIZE = 16
+HELLO = struct.Struct(f"!{TOKEN_SIZE}sI")  # token, last seq the client applied
+SESSION = struct.Struct(f"!{TOKEN_SIZE}sB")  # token, status
+NO_TOKEN = bytes(TOKEN_SIZE)
+ROOM_ID = struct.Struct("!I")
+FEATURED_ROOM = 0xFFFFFFFF  # Watch whichever match in progress has the most spectators
+COUNT = struct.Struct("!I")
+EVENT = struct.Struct("!IBBHHH")  # result is a ship id for EV_SUNK, so it needs 16 bits on large boards
+SHIP_FIELDS = 4  # x, y, length, horizontal
+
+FLAG_SETUP_COMPLETE = 1
+FLAG_GAME_OVER = 2
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def frame(msg_type, payload):
+    """Prefix a payload with its length, the protocol version and the message type"""
+    return FRAME_HEADER.pack(len(payload), PROTOCOL_VERSION, msg_type) + payload
+
+
+def parse_header(header, limit=None):
+    """Return (payload length, message type) from a frame header. Snapshots may be up to
+    MAX_SNAPSHOT unless limit says otherwise; the server passes MAX_PAYLOAD, as clients never send them"""
+    length, version, msg_type = FRAME_HEADER.unpack(header)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    if limit is None:
+        limit = MAX_SNAPSHOT if msg_type == MSG_SNAPSHOT else MAX_PAYLOAD
+    if length > limit:
+        raise ProtocolError(f"Frame too large ({length} bytes)")
+    return length, msg_type
+
+
+def pack_game(game):
+    """Serialize a BattleshipsGame into bytes"""
+    flags = 0
+    if game.setup_complete:
+        flags |= FLAG_SETUP_COMPLETE
+    if game.game_over:
+        flags |= FLAG_GAME_OVER
+    winner = -1 if game.winner is None else game.winner
+    parts = [GAME_HEADER.pack(game.player_id, game.BOARD_SIZE, flags, game.current_turn, winner,
+                              len(game.ships), len(game.shots_fired), len(game.hits))]
+    # Flat arrays instead of one struct call per ship/shot/cell; bytes unless the board is too big for them
+    typecode = coord_type(game.BOARD_SIZE)
+    parts.append(pack_array(typecode, chain.from_iterable(game.ships)))
+    parts.append(pack_array(typecode, chain.from_iterable(game.shots_fired)))
+    parts.append(pack_array(typecode, chain.from_iterable(game.hits)))
+    for board in (game.own_bitboard, game.opponent_bitboard):
+        parts.append(pack_board(board))
+    return b"".join(parts)
+
+
+def coord_type(size):
+    """array typecode for coordinates on a board of this size"""
+    return "B" if size <= 256 else "H"
+
+
+def pack_array(typecode, values):
+    """Values as a network-order array"""
+    values = array(typecode, values)
+    if values.itemsize > 1 and sys.byteorder == "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_array(typecode, buf, offset, count):
+    """Read count values of typecode starting at offset"""
+    values = array(typecode)
+    chunk = buf[offset:offset + count * values.itemsize]
+    if len(chunk) != count * values.itemsize:
+        raise ProtocolError("Truncated game state")
+    values.frombytes(chunk)
+    if values.itemsize > 1 and sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def mask_bytes(size):
+    return (size * size + 7) // 8
+
+
+def pack_board(board):
+    """Ships, hits and misses: one bit per cell each, or for sparse boards counted lists of
+    cell indices, so a large board costs what has happened on it rather than its area"""
+    if isinstance(board, SparseBoard):
+        parts = []
+        for cells in (board.ships, board.hits, board.misses):
+            parts.append(COUNT.pack(len(cells)))
+            parts.append(pack_array("I", sorted(cells)))
+        return b"".join(parts)
+    n = mask_bytes(board.size)
+    return (board.ships.to_bytes(n, "little") + board.hits.to_bytes(n, "little")
+            + board.misses.to_bytes(n, "little"))
+
+
+def unpack_board(buf, offset, size):
+    board = make_board(size)
+    if isinstance(board, SparseBoard):
+        for name in ("ships", "hits", "misses"):
+            (count,) = COUNT.unpack_from(buf, offset)
+            offset += COUNT.size
+            cells = unpack_array("I", buf, offset, count)
+            setattr(board, name, set(cells))
+            offset += count * cells.itemsize
+        return board, offset
+    n = mask_bytes(size)
+    chunk = buf[offset:offset + 3 * n]
+    if len(chunk) != 3 * n:
+        raise ProtocolError("Truncated board")
+    board.ships = int.from_bytes(chunk[:n], "little")
+    board.hits = int.from_bytes(chunk[n:2 * n], "little")
+    board.misses = int.from_bytes(chunk[2 * n:], "little")
+    return board, offset + 3 * n
+
+
+def unpack_game(buf, offset=0):
+    """Rebuild a BattleshipsGame from bytes, returning (game, next offset)"""
+    try:
+        (player_id, board_size, flags, current_turn, winner,
+         ship_count, shot_count, hit_count) = GAME_HEADER.unpack_from(buf, offset)
+        offset += GAME_HEADER.size
+        if not 5 <= board_size <= MAX_BOARD_SIZE:
+            raise ProtocolError(f"Unexpected board size {board_size}")
+
+        # Skip __init__, which would place a fresh random fleet
+        game = BattleshipsGame.__new__(BattleshipsGame)
+        if board_size != BattleshipsGame.BOARD_SIZE:
+            game.BOARD_SIZE = board_size
+        game.player_id = player_id
+        game.setup_complete = bool(flags & FLAG_SETUP_COMPLETE)
+        game.game_over = bool(flags & FLAG_GAME_OVER)
+        game.current_turn = current_turn
+        game.winner = None if winner < 0 else winner
+
+        typecode = coord_type(board_size)
+        ships = unpack_array(typecode, buf, offset, ship_count * SHIP_FIELDS)
+        game.ships = [(ships[i], ships[i + 1], ships[i + 2], bool(ships[i + 3]))
+                      for i in range(0, len(ships), SHIP_FIELDS)]
+        offset += len(ships) * ships.itemsize
+        if board_size != BattleshipsGame.BOARD_SIZE:
+            game.SHIPS = [length for _, _, length, _ in game.ships]
+        for name, count in (("shots_fired", shot_count), ("hits", hit_count)):
+            values = unpack_array(typecode, buf, offset, count * 2)
+            cells = iter(values)
+            setattr(game, name, list(zip(cells, cells)))
+            offset += len(values) * values.itemsize
+
+        game.own_bitboard, offset = unpack_board(buf, offset, board_size)
+        game.opponent_bitboard, offset = unpack_board(buf, offset, board_size)
+        game.index_ships()
+        game.index_shots()
+    except struct.error as e:
+        raise ProtocolError(f"Malformed game state: {e}")
+    return game, offset
+
+
+def encode_snapshot(seq, own, opponent):
+    return frame(MSG_SNAPSHOT, SEQ.pack(seq) + pack_game(own) + pack_game(opponent))
+
+
+def encode_events(events):
+    return frame(MSG_EVENTS, b"".join([EVENT.pack(*event) for event in events]))
+
+
+def encode_hello(token=NO_TOKEN, seq=0):
+    return frame(MSG_HELLO, HELLO.pack(token, seq))
+
+
+def encode_session(token, status):
+    return frame(MSG_SESSION, SESSION.pack(token, status))
+
+
+def encode_watch(room_id=FEATURED_ROOM):
+    return frame(MSG_WATCH, ROOM_ID.pack(room_id))
+
+
+def encode_shoot(x, y):
+    return frame(MSG_SHOOT, CELL.pack(x, y))
+
+
+def encode_sync(seq):
+    return frame(MSG_SYNC, SEQ.pack(seq))
+
+
+def encode_resync():
+    return frame(MSG_RESYNC, b"")
+
+
+def decode(msg_type, payload):
+    """Turn a frame payload back into the object it carries"""
+    try:
+        if msg_type == MSG_EVENTS:
+            if len(payload) % EVENT.size:
+                raise ProtocolError("Truncated event batch")
+            return [Event._make(fields) for fields in EVENT.iter_unpack(payload)]
+        if msg_type == MSG_SNAPSHOT:
+            (seq,) = SEQ.unpack_from(payload)
+            own, offset = unpack_game(payload, SEQ.size)
+            opponent, _ = unpack_game(payload, offset)
+            return seq, own, opponent
+        if msg_type == MSG_SHOOT:
+            return CELL.unpack(payload)
+        if msg_type == MSG_SYNC:
+            return SEQ.unpack(payload)[0]
+        if msg_type == MSG_RESYNC:
+            return None
+        if msg_type == MSG_HELLO:
+            return HELLO.unpack(payload)
+        if msg_type == MSG_SESSION:
+            return SESSION.unpack(payload)
+        if msg_type == MSG_WATCH:
+            return ROOM_ID.unpack(payload)[0]
+    except struct.error as e:
+        raise ProtocolError(f"Malformed message {msg_type}: {e}")
+    raise ProtocolError(f"Unknown message type {msg_type}")
+
+
+def recv_exactly(sock, size):
+    """Read exactly size bytes from a blocking socket"""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-frame")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_message(sock):
+    """Read one frame from a blocking socket and return (message type, decoded object)"""
+    length, msg_type = parse_header(recv_exactly(sock, FRAME_HEADER.size))
+    return msg_type, decode(msg_type, recv_exactly(sock, length))
+
+
+async def read_frame(reader, limit=None):
+    """Read one frame from an asyncio stream and return (message type, raw payload)"""
+    length, msg_type = parse_header(await reader.readexactly(FRAME_HEADER.size), limit)
+    return msg_type, await reader.readexactly(length)
+
+
+async def read_message(reader, limit=None):
+    """Read one frame from an asyncio stream and return (message type, decoded object)"""
+    msg_type, payload = await read_frame(reader, limit)
+    return msg_type, decode(msg_type, payload)
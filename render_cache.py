@@ -0,0 +1,97 @@
+import pygame
+from collections import OrderedDict
+
+
+def draw_gradient(surface, top, bottom):
+    """Vertical gradient from top color to bottom color over the whole surface"""
+    width, height = surface.get_size()
+    for y in range(height):
+        ratio = y / height
+        r = int(top[0] * (1 - ratio) + bottom[0] * ratio)
+        g = int(top[1] * (1 - ratio) + bottom[1] * ratio)
+        b = int(top[2] * (1 - ratio) + bottom[2] * ratio)
+        pygame.draw.line(surface, (r, g, b), (0, y), (width, y))
+
+
+class LayerCache:
+    """Static layers rendered once into Surfaces and rebuilt only when their size or theme changes"""
+
+    def __init__(self):
+        self.layers = {}  # name -> ((size, theme), Surface)
+        self.builds = 0
+
+    def get(self, name, size, theme, build):
+        """Return the layer called name, calling build(surface) first if it is missing or stale"""
+        key = (size, theme)
+        entry = self.layers.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        surface = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()  # Match the display format so blits stay cheap
+        build(surface)
+        self.layers[name] = (key, surface)
+        self.builds += 1
+        return surface
+
+    def clear(self):
+        self.layers.clear()
+
+
+class TextCache:
+    """Size-bounded LRU of rendered text, so each label is rasterized once instead of every frame"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, make):
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = make()
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def render(self, font, text, color):
+        """Cached font.render(text, True, color)"""
+        return self.lookup((font, text, color, None), lambda: font.render(text, True, color))
+
+    def label(self, font, text, color, shadow=2):
+        """Text with its black drop shadow baked in, offset by shadow pixels (0 for none)"""
+        if not shadow:
+            return self.render(font, text, color)
+
+        def make():
+            text_surf = font.render(text, True, color)
+            shadow_surf = font.render(text, True, (0, 0, 0))
+            width, height = text_surf.get_size()
+            surface = pygame.Surface((width + shadow, height + shadow), pygame.SRCALPHA)
+            surface.blit(shadow_surf, (shadow, shadow))
+            surface.blit(text_surf, (0, 0))
+            return surface
+        return self.lookup((font, text, color, shadow), make)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Shared by the menu and the game screen
+LAYERS = LayerCache()
+TEXT = TextCache()
@@ -0,0 +1,132 @@
+import threading
+from engine import BattleshipsGame
+from protocol import Event, EV_SHOT, EV_TURN, EV_GAME_OVER, EV_SUNK, EV_PRESENCE, encode_snapshot
+
+
+class Room:
+    """One match: a pair of games, the turn logic between them and the event log clients sync from.
+
+    The room owns both games; they change only inside its methods, which hold the room's own lock.
+    On the asyncio server that lock is never contended, but it keeps a room safe when several
+    threads drive it, and since each room has its own there is no global lock to queue on."""
+
+    def __init__(self, room_id, fleets=None, lock=None, size=None):
+        self.room_id = room_id
+        self.lock = lock if lock is not None else threading.Lock()
+        if fleets is None:
+            fleets = (None, None)
+        self.players = [BattleshipsGame(0, fleets[0], size), BattleshipsGame(1, fleets[1], size)]
+        self.connected = [False, False]
+        self.events = []  # Event n has seq n + 1, so a client at seq s needs events[s:]
+        self.cursors = [0, 0]  # Per player, seq of the last event already sent to them
+        self.recorder = None  # Optional gamelog.GameLogWriter that gets every event
+
+    def free_slot(self):
+        """Return the first player slot nobody has taken yet, or None if the room is full"""
+        for player, taken in enumerate(self.connected):
+            if not taken:
+                return player
+        return None
+
+    def join(self):
+        slot = self.free_slot()
+        if slot is not None:
+            self.connected[slot] = True
+        return slot
+
+    def leave(self, player):
+        self.connected[player] = False
+
+    def is_empty(self):
+        return not any(self.connected)
+
+    def in_progress(self):
+        """Both seats taken and nobody has won yet"""
+        return self.free_slot() is None and self.players[0].winner is None
+
+    @property
+    def seq(self):
+        """Sequence number of the latest event"""
+        return len(self.events)
+
+    def events_since(self, seq):
+        return self.events[seq:]
+
+    def acknowledge(self, player, seq):
+        """Move a player's cursor back to what their client says it has applied"""
+        with self.lock:
+            self.cursors[player] = min(seq, self.seq)
+
+    def take_events(self, player):
+        """Events player has not been sent yet; only the new tail of the log is touched"""
+        with self.lock:
+            events = self.events[self.cursors[player]:]
+            self.cursors[player] = self.seq
+            return events
+
+    def snapshot(self, player):
+        """Encoded full state for player, who is then up to date"""
+        with self.lock:
+            self.cursors[player] = self.seq
+            return encode_snapshot(self.seq, self.players[player], self.players[1 - player])
+
+    def view(self):
+        """Encoded full state of both games for spectators, from player 0's side"""
+        with self.lock:
+            return encode_snapshot(self.seq, self.players[0], self.players[1])
+
+    def set_present(self, player, present):
+        """Log a player connecting or dropping, so their opponent hears about it"""
+        with self.lock:
+            self.emit(EV_PRESENCE, player, result=int(present))
+            if self.recorder is not None:
+                self.recorder.update(self)
+
+    def forfeit(self, player):
+        """End a match in progress in the opponent's favour, e.g. when player never came back;
+        return False if it was already over"""
+        with self.lock:
+            if self.players[0].winner is not None:
+                return False
+            winner = 1 - player
+            self.players[player].game_over = True
+            self.players[0].winner = self.players[1].winner = winner
+            self.emit(EV_GAME_OVER, winner)
+            if self.recorder is not None:
+                self.recorder.update(self)
+            return True
+
+    def emit(self, kind, player, x=0, y=0, result=0):
+        event = Event(len(self.events) + 1, kind, player, x, y, result)
+        self.events.append(event)
+        return event
+
+    def shoot(self, player, x, y):
+        """Fire a shot for player at the opponent's board; return False if the shot is not allowed"""
+        with self.lock:
+            if self.free_slot() is not None:
+                return False  # Nobody to shoot at until the second player has joined
+            shooter = self.players[player]
+            target = self.players[1 - player]
+            if shooter.game_over or target.game_over or shooter.current_turn != player:
+                return False
+            if not shooter.shoot(x, y):
+                return False  # Out of bounds or already shot here
+
+            result = target.resolve_shot(x, y)
+            hit = result.hit
+            shooter.update_opponent_board(x, y, hit)
+            self.emit(EV_SHOT, player, x, y, hit)
+            if result.sunk is not None:
+                self.emit(EV_SUNK, player, x, y, result.sunk)
+
+            if result.game_over:
+                shooter.winner = target.winner = player
+                self.emit(EV_GAME_OVER, player)
+            elif not hit:
+                # If miss, switch turn to opponent; if hit, stay on same player
+                shooter.current_turn = target.current_turn = target.player_id
+                self.emit(EV_TURN, target.player_id)
+            if self.recorder is not None:
+                self.recorder.update(self)
+            return True
@@ -1,20 +1,28 @@
+import argparse
+import asyncio
+import os
+import secrets
 import socket
-from _thread import *
-from player import BattleshipsGame
-import pickle
+import time
+import protocol
+from broadcast import Broadcast, Spectator
+from engine import MAX_BOARD_SIZE
+from gamelog import GameLogWriter, log_path
+from metrics import ServerMetrics
+from room import Room
 
 # Bind to all interfaces (0.0.0.0) to accept connections from any network interface
 server = ""
 port = 5555
+BACKLOG = 1024  # Pending connections the OS queues for us while the loop is busy
+STATS_HOST = "127.0.0.1"  # Stats are for whoever runs the server, never the network
+STATS_PORT = 5556
+SUMMARY_INTERVAL = 30  # Seconds between [stats] lines in the log; 0 turns them off
+LOG_DIR = "logs"  # Where main() records every match, see gamelog.py
+HANDSHAKE_TIMEOUT = 10  # Seconds a new connection gets to send its hello
+RECONNECT_GRACE = 30  # Seconds a dropped player's seat is kept for them to reconnect
+CLIENT_TIMEOUT = 2 * protocol.HEARTBEAT_INTERVAL  # A player silent this long has dropped, even if TCP has not noticed
 
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-try:
-    s.bind((server, port))
-except socket.error as e:
-    raise SystemExit(f"Bind failed: {e}")
-
-s.listen(2)
 
 # Get and display the server's IP address (more reliable method)
 def get_local_ip():
@@ -63,92 +71,355 @@ def get_all_ips():
     
     return ips
 
-local_ip = get_local_ip()
-all_ips = get_all_ips()
 
-print(f"Server Started on port {port}")
-print(f"Primary Server IP: {local_ip}")
-if len(all_ips) > 1:
-    print(f"All available IPs: {', '.join(all_ips)}")
-    print("If connection fails, try using one of the other IPs in network.py")
-print("Make sure clients use the correct IP address in network.py")
-print("Waiting for connections...")
+async def serve_stats(reader, writer, metrics):
+    """Tiny HTTP endpoint: GET /json for JSON, anything else for the text report"""
+    try:
+        request = await reader.readline()
+        while (await reader.readline()).strip():
+            pass  # Skip the headers
+        parts = request.split()
+        path = parts[1].decode("latin-1") if len(parts) > 1 else "/"
+        if path.startswith("/json"):
+            body, content_type = metrics.to_json(), "application/json"
+        else:
+            body, content_type = metrics.to_text(), "text/plain"
+        body = body.encode()
+        writer.write(f"HTTP/1.0 200 OK\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
 
-# Initialize two battleships games
-players = [BattleshipsGame(0), BattleshipsGame(1)]
 
-def threaded_client(conn, player):
-    conn.send(pickle.dumps(players[player]))
-    reply = ""
-    while True:
-        try:
-            data = pickle.loads(conn.recv(2048))
-            players[player] = data
+class Session:
+    """A player's seat, which outlives any one connection"""
+
+    def __init__(self, token, room, player):
+        self.token = token
+        self.room = room
+        self.player = player
+        self.writer = None  # Current connection, None while the player is away
+        self.conn = None  # Its ConnectionStats
+        self.expiry = None  # Timer that gives the seat up if they don't come back
+
+
+class GameServer:
+    """Hosts any number of rooms on one event loop and pairs incoming players into them"""
+
+    def __init__(self, log_dir=None, board_size=None, shard=None):
+        self.log_dir = log_dir  # Record each match here if set
+        self.board_size = board_size  # None for the normal 10x10 game
+        self.shard = shard  # cluster.Shard when this is one worker of several, see cluster.py
+        self.rooms = {}
+        self.waiting_room = None  # Room with one player waiting for an opponent
+        # Workers of a cluster number their rooms index, index + workers, ... so ids never clash
+        self.next_room_id = shard.index if shard is not None else 0
+        self.room_step = shard.workers if shard is not None else 1
+        self.sessions = {}  # token -> Session
+        self.seats = {}  # (room_id, player) -> Session, to push to a player's opponent
+        self.broadcasts = {}  # room_id -> Broadcast, for rooms somebody is watching
+        self.metrics = ServerMetrics()
+
+    def assign_room(self):
+        """Put a new connection into the waiting room, opening a fresh room if needed"""
+        room = self.waiting_room
+        if room is None or room.free_slot() is None:
+            room = Room(self.next_room_id, size=self.board_size)
+            if self.log_dir is not None:
+                room.recorder = GameLogWriter(log_path(self.log_dir, room.room_id), room)
+            self.rooms[room.room_id] = room
+            self.next_room_id += self.room_step
+            self.metrics.rooms = len(self.rooms)
+        player = room.join()
+        # Once both seats are taken the next connection starts a new room
+        self.set_waiting_room(room if room.free_slot() is not None else None)
+        return room, player
+
+    def set_waiting_room(self, room):
+        self.waiting_room = room
+        if self.shard is not None:
+            self.shard.set_waiting(room is not None)
+
+    def release(self, room, player):
+        room.leave(player)
+        if room.is_empty():
+            self.rooms.pop(room.room_id, None)
+            self.metrics.rooms = len(self.rooms)
+            if room.recorder is not None:
+                room.recorder.close()
+            broadcast = self.broadcasts.pop(room.room_id, None)
+            if broadcast is not None:
+                broadcast.close()
+            if self.waiting_room is room:
+                self.set_waiting_room(None)
+
+    def new_token(self):
+        token = secrets.token_bytes(protocol.TOKEN_SIZE)
+        if self.shard is not None:
+            token = bytes([self.shard.index]) + token[1:]  # Tells the other workers whose session it is
+        return token
+
+    def open_session(self):
+        room, player = self.assign_room()
+        token = self.new_token()
+        session = self.sessions[token] = Session(token, room, player)
+        self.seats[room.room_id, player] = session
+        return session
+
+    def close_session(self, session):
+        self.sessions.pop(session.token, None)
+        self.seats.pop((session.room.room_id, session.player), None)
+        self.release(session.room, session.player)
+
+    def push(self, room, player):
+        """Send a player the events they have not seen without being asked; nothing while they are away.
+        Called whenever the room logs events, so spectators are sent them too"""
+        broadcast = self.broadcasts.get(room.room_id)
+        if broadcast is not None:
+            broadcast.schedule()
+        session = self.seats.get((room.room_id, player))
+        if session is None or session.writer is None:
+            return
+        data = protocol.encode_events(room.take_events(player))
+        session.writer.write(data)  # A few bytes per event; no need to wait for the socket
+        self.metrics.sent(session.conn, len(data))
+
+    def detach(self, session, writer):
+        """A connection ended; hold the seat for a reconnect if the match is still on"""
+        if session.writer is not writer:
+            return  # A reconnect has already taken the session over
+        session.writer = None
+        session.room.set_present(session.player, False)
+        self.push(session.room, 1 - session.player)
+        if session.room.in_progress():
+            session.expiry = asyncio.get_running_loop().call_later(RECONNECT_GRACE, self.expire, session)
+        else:
+            self.close_session(session)
+
+    def expire(self, session):
+        """The player did not come back in time: their opponent wins, then the seat is given up"""
+        session.expiry = None
+        room, player = session.room, session.player
+        if room.forfeit(player):
+            print(f"Room {room.room_id}: player {player} did not reconnect, player {1 - player} wins")
+            self.push(room, 1 - player)
+        self.close_session(session)
+
+    async def handshake(self, writer, token, seq):
+        """Attach the connection to a new or resumed session; None if it has expired"""
+        if token == protocol.NO_TOKEN:
+            session = self.open_session()
+            session.writer = writer
+            return session, protocol.SESSION_NEW, seq
+        session = self.sessions.get(token)
+        if session is None:
+            writer.write(protocol.encode_session(token, protocol.SESSION_EXPIRED))
+            await writer.drain()
+            return None, protocol.SESSION_EXPIRED, seq
+        if session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+        if session.writer is not None:
+            session.writer.close()  # Half-open old connection the client has already given up on
+        session.writer = writer
+        self.metrics.resumes += 1
+        return session, protocol.SESSION_RESUMED, seq
 
-            if not data:
-                print("Disconnected")
-                break
+    async def handle_client(self, reader, writer, first=None):
+        """Serve one connection; first is its opening message if another worker already read it"""
+        addr = writer.get_extra_info("peername")
+        try:
+            if first is None:
+                first = await asyncio.wait_for(protocol.read_message(reader, protocol.MAX_PAYLOAD), HANDSHAKE_TIMEOUT)
+                if self.shard is not None and self.shard.hand_over(*first, writer):
+                    return  # Another worker owns this session or room
+            msg_type, body = first
+            if msg_type == protocol.MSG_WATCH:
+                await self.handle_spectator(reader, writer, body)
+                return
+            if msg_type != protocol.MSG_HELLO:
+                raise protocol.ProtocolError(f"Expected a hello, got message type {msg_type}")
+            session, status, seq = await self.handshake(writer, *body)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, protocol.ProtocolError) as e:
+            print(f"Handshake with {addr} failed: {e!r}")
+            writer.close()
+            return
+        if session is None:
+            print(f"Expired session from {addr}")
+            writer.close()
+            return
+        room, player = session.room, session.player
+        metrics = self.metrics
+        conn = session.conn = metrics.open_connection(addr, room.room_id, player)
+        room.set_present(player, True)
+        self.push(room, 1 - player)
+        watchdog = asyncio.create_task(self.watchdog(writer, conn))  # Keep a reference
+        if status == protocol.SESSION_RESUMED:
+            print(f"Reconnected: {addr} (room {room.room_id}, player {player}, from seq {seq})")
+        else:
+            print(f"Connected to: {addr} (room {room.room_id}, player {player})")
+        try:
+            await self.send(writer, conn, protocol.encode_session(session.token, status))
+            if status == protocol.SESSION_RESUMED:
+                # Only what was missed: everything after the last event the client applied
+                room.acknowledge(player, seq)
+                await self.send(writer, conn, protocol.encode_events(room.take_events(player)))
             else:
-                # Send opponent's game state
-                if player == 1:
-                    reply = players[0]
-                    opponent_idx = 0
+                await self.send_snapshot(writer, room, player, conn)
+            while True:
+                msg_type, payload = await protocol.read_frame(reader, protocol.MAX_PAYLOAD)
+                # Time from here to the reply being handed to the socket is the request latency
+                started = time.perf_counter()
+                metrics.received(conn, protocol.FRAME_HEADER.size + len(payload))
+                body = protocol.decode(msg_type, payload)
+                decoded = time.perf_counter()
+                metrics.time("decode", decoded - started)
+                if msg_type == protocol.MSG_SHOOT:
+                    if room.shoot(player, *body):
+                        self.push(room, 1 - player)
+                    metrics.time("shot", time.perf_counter() - decoded)
+                elif msg_type == protocol.MSG_SYNC:
+                    room.acknowledge(player, body)
+                elif msg_type == protocol.MSG_RESYNC:
+                    await self.send_snapshot(writer, room, player, conn)
+                    metrics.request_done(conn, time.perf_counter() - started)
+                    continue
                 else:
-                    reply = players[1]
-                    opponent_idx = 1
-                
-                # Synchronize current_turn from shared state
-                data.current_turn = players[opponent_idx].current_turn
-                
-                # Process new shots from this player on opponent's board (only if it's their turn)
-                for shot_x, shot_y in data.shots_fired:
-                    # Check if this shot hasn't been processed yet on opponent's board
-                    if reply.own_board[shot_y][shot_x] == 0 or reply.own_board[shot_y][shot_x] == 1:
-                        # Only process if it's this player's turn
-                        if data.current_turn == data.player_id:
-                            hit = reply.receive_shot(shot_x, shot_y)
-                            data.update_opponent_board(shot_x, shot_y, hit)
-                            # If miss, switch turn to opponent; if hit, stay on same player
-                            if not hit:
-                                data.current_turn = reply.player_id
-                
-                # Process new shots from opponent on this player's board
-                for shot_x, shot_y in reply.shots_fired:
-                    # Check if this shot hasn't been processed yet on this player's board
-                    if data.own_board[shot_y][shot_x] == 0 or data.own_board[shot_y][shot_x] == 1:
-                        hit = data.receive_shot(shot_x, shot_y)
-                        reply.update_opponent_board(shot_x, shot_y, hit)
-                
-                # Synchronize current_turn to shared state (both players should have same turn)
-                players[player].current_turn = data.current_turn
-                players[opponent_idx].current_turn = data.current_turn
-                reply.current_turn = data.current_turn
-                
-                # Update winner status
-                if data.game_over:
-                    data.winner = reply.player_id
-                    reply.winner = reply.player_id
-                if reply.game_over:
-                    reply.winner = data.player_id
-                    data.winner = data.player_id
-
-                print(f"Player {player} - Shots: {len(data.shots_fired)}, Hits: {len(data.hits)}")
-
-            # Return both updated states so client can refresh its own board and opponent view
-            conn.sendall(pickle.dumps((players[player], reply)))
+                    raise protocol.ProtocolError(f"Unexpected message type {msg_type}")
+                # Every command is answered with the events the client has not seen yet
+                encoding = time.perf_counter()
+                data = protocol.encode_events(room.take_events(player))
+                metrics.time("encode", time.perf_counter() - encoding)
+                await self.send(writer, conn, data)
+                metrics.request_done(conn, time.perf_counter() - started)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            print("Disconnected")
+        except protocol.ProtocolError as e:
+            print(f"Protocol error: {e}")
         except Exception as e:
             print(f"Error: {e}")
             import traceback
             traceback.print_exc()
-            break
+        finally:
+            watchdog.cancel()
+            print(f"Lost connection (room {room.room_id}, player {player})")
+            metrics.close_connection(conn)
+            self.detach(session, writer)
+            writer.close()
+
+    async def watchdog(self, writer, conn):
+        """Abort a player's connection once a whole CLIENT_TIMEOUT passes without a frame from them.
+        Clients heartbeat well within that, so this is a dead peer TCP has not noticed; a timer per
+        connection rather than a timeout on every read keeps it off the request path"""
+        seen = -1
+        while conn.messages_in != seen:
+            seen = conn.messages_in
+            await asyncio.sleep(CLIENT_TIMEOUT)
+        print(f"Timed out: nothing from {conn.addr} in {CLIENT_TIMEOUT}s")
+        writer.transport.abort()  # The read in handle_client fails and the seat is kept as for any drop
+
+    def featured_room(self):
+        """The match in progress with the most spectators, newest first on a tie"""
+        live = [room for room in self.rooms.values() if room.in_progress()]
+        if not live:
+            return None
+        return max(live, key=lambda room: (len(self.broadcasts[room.room_id].spectators)
+                                           if room.room_id in self.broadcasts else 0, room.room_id))
+
+    async def handle_spectator(self, reader, writer, room_id):
+        """Stream a room to a read-only viewer until either side goes away"""
+        addr = writer.get_extra_info("peername")
+        room = self.featured_room() if room_id == protocol.FEATURED_ROOM else self.rooms.get(room_id)
+        if room is None:
+            print(f"Spectator {addr}: no such room")
+            writer.close()
+            return
+        broadcast = self.broadcasts.get(room.room_id)
+        if broadcast is None:
+            broadcast = self.broadcasts[room.room_id] = Broadcast(room, self.metrics)
+        spectator = Spectator(writer)
+        broadcast.add(spectator)
+        self.metrics.spectators += 1
+        try:
+            # Spectators have nothing to say; reading only tells us when they leave or were dropped
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.metrics.spectators -= 1
+            broadcast.remove(spectator)
+            writer.close()
+
+    async def send(self, writer, conn, data):
+        """Write a frame and wait for the socket to take it; the wait is the "send" stage"""
+        started = time.perf_counter()
+        writer.write(data)
+        await writer.drain()
+        self.metrics.time("send", time.perf_counter() - started)
+        self.metrics.sent(conn, len(data))
+
+    async def send_snapshot(self, writer, room, player, conn):
+        """Send full state for both games; the player is then up to date"""
+        await self.send(writer, conn, room.snapshot(player))
+
+    async def handle_stats(self, reader, writer):
+        await serve_stats(reader, writer, self.metrics)
 
-    print("Lost connection")
-    conn.close()
+    async def log_summaries(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(self.metrics.summary())
+
+    async def serve(self, host=server, port=port, stats_port=STATS_PORT, summary_interval=SUMMARY_INTERVAL,
+                    reuse_port=False):
+        try:
+            srv = await asyncio.start_server(self.handle_client, host, port, backlog=BACKLOG,
+                                             reuse_port=reuse_port)
+        except OSError as e:
+            raise SystemExit(f"Bind failed: {e}")
+        if stats_port is not None:
+            try:
+                await asyncio.start_server(self.handle_stats, STATS_HOST, stats_port)
+                print(f"Stats on http://{STATS_HOST}:{stats_port}/ (JSON at /json)")
+            except OSError as e:
+                print(f"Stats endpoint disabled, bind failed: {e}")  # The game still works without it
+        if summary_interval:
+            self.summary_task = asyncio.create_task(self.log_summaries(summary_interval))  # Keep a reference
+        async with srv:
+            await srv.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Battleships server")
+    parser.add_argument("--board-size", type=int, default=None,
+                        help=f"large-board event mode, up to {MAX_BOARD_SIZE}x{MAX_BOARD_SIZE}")
+    args = parser.parse_args()
+    if args.board_size is not None and not 5 <= args.board_size <= MAX_BOARD_SIZE:
+        parser.error(f"--board-size must be between 5 and {MAX_BOARD_SIZE}")
+
+    local_ip = get_local_ip()
+    all_ips = get_all_ips()
+
+    print(f"Server Started on port {port}")
+    print(f"Primary Server IP: {local_ip}")
+    if len(all_ips) > 1:
+        print(f"All available IPs: {', '.join(all_ips)}")
+        print("If connection fails, try using one of the other IPs in network.py")
+    print("Make sure clients use the correct IP address in network.py")
+    if args.board_size:
+        print(f"Board size: {args.board_size}x{args.board_size}")
+    print("Waiting for connections...")
+
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        asyncio.run(GameServer(LOG_DIR, args.board_size).serve())
+    except KeyboardInterrupt:
+        pass
 
-currentPlayer = 0
-while True:
-    conn, addr = s.accept()
-    print("Connected to:", addr)
 
-    start_new_thread(threaded_client, (conn, currentPlayer))
-    currentPlayer += 1
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Play scripted games headlessly on the engine and report throughput.
+
+    python simulate.py --games 100000 --strategy parity --seed 1
+"""
+import argparse
+import random
+import time
+from engine import BattleshipsGame
+from placement import random_fleets
+from room import Room
+
+
+def random_order(size, rng):
+    """Every cell once, in random order"""
+    cells = [(x, y) for y in range(size) for x in range(size)]
+    rng.shuffle(cells)
+    return cells
+
+
+def sweep_order(size, rng):
+    """Row by row from the top-left corner"""
+    return [(x, y) for y in range(size) for x in range(size)]
+
+
+def parity_order(size, rng):
+    """Checkerboard cells first (every ship covers at least one), then the rest, each half shuffled"""
+    even = [(x, y) for y in range(size) for x in range(size) if (x + y) % 2 == 0]
+    odd = [(x, y) for y in range(size) for x in range(size) if (x + y) % 2 == 1]
+    rng.shuffle(even)
+    rng.shuffle(odd)
+    return even + odd
+
+
+STRATEGIES = {
+    "random": random_order,
+    "sweep": sweep_order,
+    "parity": parity_order,
+}
+
+
+def play(room, orders):
+    """Run a match to the end with each player firing down its own list; return (winner, shots)"""
+    next_shot = [0, 0]
+    shots = 0
+    while True:
+        player = room.players[0].current_turn
+        order = orders[player]
+        if next_shot[player] >= len(order):
+            return None, shots  # Ran out of cells, can only happen with a broken fleet
+        x, y = order[next_shot[player]]
+        next_shot[player] += 1
+        room.shoot(player, x, y)
+        shots += 1
+        if room.players[player].winner is not None:
+            return player, shots
+
+
+def simulate(games, strategy="random", seed=None, batch=1000):
+    """Play games matches and return a summary dict"""
+    rng = random.Random(seed)
+    order_for = STRATEGIES[strategy]
+    size = BattleshipsGame.BOARD_SIZE
+    wins = [0, 0]
+    total_shots = 0
+    played = 0
+
+    start = time.perf_counter()
+    while played < games:
+        count = min(batch, games - played)
+        # Fleets are generated in bulk, which is cheaper than placing them game by game
+        fleets = random_fleets(count * 2, size, BattleshipsGame.SHIPS, rng)
+        for i in range(count):
+            room = Room(played + i, (fleets[2 * i], fleets[2 * i + 1]))
+            room.join()
+            room.join()
+            winner, shots = play(room, (order_for(size, rng), order_for(size, rng)))
+            if winner is not None:
+                wins[winner] += 1
+            total_shots += shots
+        played += count
+    elapsed = time.perf_counter() - start
+
+    return {
+        "games": played,
+        "strategy": strategy,
+        "seconds": elapsed,
+        "games_per_second": played / elapsed if elapsed else 0.0,
+        "games_per_hour": played / elapsed * 3600 if elapsed else 0.0,
+        "avg_shots": total_shots / played if played else 0.0,
+        "wins": wins,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Battleships simulation")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="random")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    result = simulate(args.games, args.strategy, args.seed)
+    print(f"Played {result['games']} games ({result['strategy']}) in {result['seconds']:.2f}s")
+    print(f"Throughput: {result['games_per_second']:.0f} games/s, {result['games_per_hour'] / 1e6:.2f}M games/hour")
+    print(f"Average shots per game: {result['avg_shots']:.1f}")
+    print(f"Wins: player 0 {result['wins'][0]}, player 1 {result['wins'][1]}")
+
+
+if __name__ == "__main__":
+    main()
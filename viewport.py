@@ -0,0 +1,154 @@
+import pygame
+from board import HIT, MISS, SHIP
+from player import CELL_SIZE
+from render_cache import TEXT
+
+# Drawing for large boards: only the cells inside a panel-sized window are touched, so the cost
+# of a frame depends on the zoom level, never on how big the board is
+
+MIN_CELL = 6  # Most zoomed out; at most (panel / MIN_CELL) ** 2 cells are ever looked at
+MAX_CELL = CELL_SIZE
+GRID_MIN_CELL = 10  # Below this the grid lines would cover the cells
+PAN_STEP = 5  # Cells per arrow-key press
+ARROWS = {
+    pygame.K_LEFT: (-PAN_STEP, 0),
+    pygame.K_RIGHT: (PAN_STEP, 0),
+    pygame.K_UP: (0, -PAN_STEP),
+    pygame.K_DOWN: (0, PAN_STEP),
+}
+
+COLOR_WATER = (30, 41, 59)
+COLOR_GRID = (59, 130, 246)
+COLOR_SHIP = (99, 102, 241)
+COLOR_HIT = (239, 68, 68)
+COLOR_MISS = (148, 163, 184)
+COLOR_HOVER = (94, 234, 212)
+COLOR_TEXT_BRIGHT = (255, 255, 255)
+
+
+class Viewport:
+    """A scrollable, zoomable window onto a board drawn inside rect"""
+
+    def __init__(self, rect, board_size, cell=MAX_CELL):
+        self.rect = pygame.Rect(rect)
+        self.board_size = board_size
+        self.cell = cell  # Pixels per cell
+        self.x = 0.0  # Board coordinates of the top-left corner
+        self.y = 0.0
+        self.clamp()
+
+    def clamp(self):
+        self.cell = max(MIN_CELL, min(MAX_CELL, self.cell))
+        self.x = max(0.0, min(self.x, self.board_size - self.rect.width / self.cell))
+        self.y = max(0.0, min(self.y, self.board_size - self.rect.height / self.cell))
+
+    def visible(self):
+        """Range of cells at least partly inside the panel: (x0, y0, x1, y1), end exclusive"""
+        x0, y0 = int(self.x), int(self.y)
+        x1 = min(self.board_size, int(self.x + self.rect.width / self.cell) + 1)
+        y1 = min(self.board_size, int(self.y + self.rect.height / self.cell) + 1)
+        return x0, y0, x1, y1
+
+    def cell_at(self, pos):
+        """Board cell under a screen position, or None outside the panel or the board"""
+        if not self.rect.collidepoint(pos):
+            return None
+        x = int(self.x + (pos[0] - self.rect.x) / self.cell)
+        y = int(self.y + (pos[1] - self.rect.y) / self.cell)
+        if 0 <= x < self.board_size and 0 <= y < self.board_size:
+            return x, y
+        return None
+
+    def cell_rect(self, x, y):
+        return pygame.Rect(round(self.rect.x + (x - self.x) * self.cell),
+                           round(self.rect.y + (y - self.y) * self.cell), self.cell, self.cell)
+
+    def pan(self, dx, dy):
+        """Scroll by dx, dy cells"""
+        self.x += dx
+        self.y += dy
+        self.clamp()
+
+    def drag(self, dx_px, dy_px):
+        """Scroll so the board follows a mouse drag of dx_px, dy_px pixels"""
+        self.pan(-dx_px / self.cell, -dy_px / self.cell)
+
+    def zoom(self, steps, anchor=None):
+        """Zoom in (steps > 0) or out, keeping the cell under anchor in place"""
+        if anchor is None:
+            anchor = self.rect.center
+        ax = self.x + (anchor[0] - self.rect.x) / self.cell
+        ay = self.y + (anchor[1] - self.rect.y) / self.cell
+        self.cell = self.cell + steps * max(1, self.cell // 5)
+        self.clamp()
+        self.x = ax - (anchor[0] - self.rect.x) / self.cell
+        self.y = ay - (anchor[1] - self.rect.y) / self.cell
+        self.clamp()
+
+    def center_on(self, x, y):
+        self.x = x + 0.5 - self.rect.width / self.cell / 2
+        self.y = y + 0.5 - self.rect.height / self.cell / 2
+        self.clamp()
+
+    def handle_event(self, event):
+        """Mouse wheel zooms, right or middle drag and the arrow keys pan; return True if the event was used"""
+        if event.type == pygame.KEYDOWN and event.key in ARROWS:
+            if self.rect.collidepoint(pygame.mouse.get_pos()):
+                self.pan(*ARROWS[event.key])
+                return True
+        elif event.type == pygame.MOUSEWHEEL:
+            pos = pygame.mouse.get_pos()
+            if self.rect.collidepoint(pos):
+                self.zoom(event.y, pos)
+                return True
+        elif event.type == pygame.MOUSEMOTION and (event.buttons[1] or event.buttons[2]):
+            if self.rect.collidepoint(event.pos):
+                self.drag(*event.rel)
+                return True
+        return False
+
+
+def draw_board_view(win, view, board, show_ships=True, hover_cell=None):
+    """Draw the visible part of a board; only cells inside the viewport are looked up"""
+    win.set_clip(view.rect)
+    pygame.draw.rect(win, COLOR_WATER, view.rect)
+    x0, y0, x1, y1 = view.visible()
+    size = view.cell
+    pad = 1 if size < GRID_MIN_CELL else 2
+    cell = board.cell
+    for y in range(y0, y1):
+        for x in range(x0, x1):
+            code = cell(x, y)
+            if code == SHIP and not show_ships:
+                continue
+            if code == SHIP:
+                pygame.draw.rect(win, COLOR_SHIP, view.cell_rect(x, y).inflate(-pad, -pad))
+            elif code == HIT:
+                rect = view.cell_rect(x, y)
+                pygame.draw.rect(win, COLOR_HIT, rect.inflate(-pad, -pad))
+                if size >= GRID_MIN_CELL:
+                    pygame.draw.circle(win, COLOR_TEXT_BRIGHT, rect.center, size // 4)
+            elif code == MISS:
+                pygame.draw.circle(win, COLOR_MISS, view.cell_rect(x, y).center, max(1, size // 5))
+
+    if size >= GRID_MIN_CELL:
+        left, top = view.cell_rect(x0, y0).topleft
+        right, bottom = view.cell_rect(x1, y1).topleft
+        for x in range(x0, x1 + 1):
+            px = view.cell_rect(x, y0).x
+            pygame.draw.line(win, COLOR_GRID, (px, top), (px, bottom), 1)
+        for y in range(y0, y1 + 1):
+            py = view.cell_rect(x0, y).y
+            pygame.draw.line(win, COLOR_GRID, (left, py), (right, py), 1)
+
+    if hover_cell is not None and cell(*hover_cell) == 0:
+        pygame.draw.rect(win, COLOR_HOVER, view.cell_rect(*hover_cell), width=2)
+    win.set_clip(None)
+    pygame.draw.rect(win, COLOR_GRID, view.rect, width=1)
+
+
+def draw_position(win, font, view, topright):
+    """Which part of the board is on screen, e.g. "120-129, 40-49 / 1000", right-aligned at topright"""
+    x0, y0, x1, y1 = view.visible()
+    text = TEXT.render(font, f"{x0}-{x1 - 1}, {y0}-{y1 - 1} / {view.board_size}", COLOR_MISS)
+    win.blit(text, text.get_rect(topright=topright))
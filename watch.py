@@ -0,0 +1,53 @@
+"""Watch a match live from the terminal.
+
+    python watch.py 192.168.56.1            # the featured match
+    python watch.py 192.168.56.1 --room 3
+"""
+import argparse
+import socket
+import protocol
+from network import apply_event
+
+NAMES = {protocol.EV_SHOT: "shot", protocol.EV_TURN: "turn",
+         protocol.EV_GAME_OVER: "game over", protocol.EV_SUNK: "sunk", protocol.EV_PRESENCE: "presence"}
+
+
+def score(first, second):
+    return f"hits {len(first.hits)}:{len(second.hits)}, shots {len(first.shots_fired)}:{len(second.shots_fired)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a Battleships match")
+    parser.add_argument("host")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--room", type=int, default=protocol.FEATURED_ROOM, help="room id (default: featured match)")
+    args = parser.parse_args()
+
+    sock = socket.create_connection((args.host, args.port))
+    sock.sendall(protocol.encode_watch(args.room))
+    seq = None
+    try:
+        while True:
+            msg_type, body = protocol.recv_message(sock)
+            if msg_type == protocol.MSG_SNAPSHOT:
+                # First frame, or we fell behind and the server skipped us ahead
+                print(f"{'Watching' if seq is None else 'Skipped ahead to'} seq {body[0]}: {score(body[1], body[2])}")
+                seq, first, second = body
+                continue
+            for event in body:
+                if event.seq <= seq:
+                    continue
+                apply_event(first, second, event)
+                seq = event.seq
+                print(f"{event.seq:>5} player {event.player} {NAMES.get(event.kind, event.kind):<9} "
+                      f"({event.x}, {event.y}) {event.result}  {score(first, second)}")
+    except ConnectionError:
+        print("Match closed")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()